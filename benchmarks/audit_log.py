@@ -0,0 +1,65 @@
+"""Cost of audit events on the request path and write throughput of the audit table.
+
+Compares one INSERT per event (what a synchronous audit write on /auth/login would
+cost) with batched multi-row INSERT and COPY into auth_events. Needs the configured
+database migrated to head; the rows written are deleted afterwards.
+
+Usage: python -m benchmarks.audit_log [events]
+"""
+import asyncio
+import sys
+import time
+import timeit
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+from src.db.database import get_engine, dispose_engine
+from src.repositories.audit_repository import SqlaAuditRepository
+from src.services.audit_log import AuditLog, AuditEvent
+
+MARKER = 'benchmark'
+
+
+def rows(count: int) -> list[tuple]:
+    now = datetime.utcnow()
+    user_id = uuid.uuid4()
+    return [(now, AuditEvent.LOGIN.value, True, user_id, 'bench@example.com', '127.0.0.1', MARKER)] * count
+
+
+async def write_rate(repository: SqlaAuditRepository, events: int, batch_size: int) -> float:
+    batch = rows(batch_size)
+    started = time.perf_counter()
+    for _ in range(events // batch_size):
+        await repository.write(batch)
+    return events // batch_size * batch_size / (time.perf_counter() - started)
+
+
+async def main(events: int = 20000):
+    record_log = AuditLog(SqlaAuditRepository(get_engine()), max_buffer=10 ** 9)
+    record_us = timeit.timeit(lambda: record_log.record(AuditEvent.LOGIN, True, user_id=uuid.uuid4(),
+                                                        email='bench@example.com', client_ip='127.0.0.1'),
+                              number=events) / events * 1e6
+    print(f'AuditLog.record: {record_us:.2f} us/event\n')
+
+    await AuditLog(SqlaAuditRepository(get_engine())).maintain()
+    cases = {
+        'INSERT per event': (SqlaAuditRepository(get_engine(), use_copy=False), 1, min(events, 2000)),
+        'INSERT batch 100': (SqlaAuditRepository(get_engine(), use_copy=False), 100, events),
+        'INSERT batch 500': (SqlaAuditRepository(get_engine(), use_copy=False), 500, events),
+        'COPY batch 100': (SqlaAuditRepository(get_engine(), use_copy=True), 100, events),
+        'COPY batch 500': (SqlaAuditRepository(get_engine(), use_copy=True), 500, events),
+    }
+    print(f'{"write":<18} {"events/s":>10}')
+    try:
+        for name, (repository, batch_size, count) in cases.items():
+            print(f'{name:<18} {await write_rate(repository, count, batch_size):>10.0f}')
+    finally:
+        async with get_engine().begin() as connection:
+            await connection.execute(text('DELETE FROM auth_events WHERE detail = :marker'), {'marker': MARKER})
+        await dispose_engine()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*map(int, sys.argv[1:2])))
@@ -0,0 +1,42 @@
+"""Compares the HMAC email tokens against the previous RS256 JWT confirmation tokens.
+
+Usage: python -m benchmarks.email_tokens [iterations]
+"""
+import asyncio
+import sys
+import timeit
+import uuid
+
+from src.core.config import get_settings
+from src.core.email_token import EmailTokenProvider, InMemoryConsumedTokenStore, TokenPurpose
+from src.core.jwt_provider import JWTProvider
+
+
+def main(iterations: int = 2000):
+    user_id = uuid.uuid4()
+    lifetime = get_settings().CONFIRMATION_TOKEN_LIFETIME
+    payload = {'sub': str(user_id), 'email': 'bench@example.com', 'confirmation': True}
+    provider = EmailTokenProvider(b'benchmark-secret')
+    store = InMemoryConsumedTokenStore()
+    run = asyncio.new_event_loop().run_until_complete
+
+    jwt_token = JWTProvider.encode_refresh_token(payload, expires_delta=lifetime)
+    hmac_token = provider.encode(user_id, TokenPurpose.CONFIRM_EMAIL, lifetime * 24 * 60 * 60)
+
+    cases = {
+        'jwt encode': lambda: JWTProvider.encode_refresh_token(payload, expires_delta=lifetime),
+        'jwt decode': lambda: JWTProvider.decode(jwt_token),
+        'hmac encode': lambda: provider.encode(user_id, TokenPurpose.CONFIRM_EMAIL, lifetime * 24 * 60 * 60),
+        'hmac decode': lambda: provider.decode(hmac_token, TokenPurpose.CONFIRM_EMAIL),
+        'hmac encode+consume': lambda: run(provider.consume(
+            provider.encode(user_id, TokenPurpose.CONFIRM_EMAIL, lifetime * 24 * 60 * 60),
+            TokenPurpose.CONFIRM_EMAIL, store)),
+    }
+    print(f'token length: jwt={len(jwt_token)} hmac={len(hmac_token)}')
+    for name, func in cases.items():
+        elapsed = timeit.timeit(func, number=iterations)
+        print(f'{name:<22} {elapsed / iterations * 1e6:10.1f} us/op')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from src.adapters.producers.rabbitmq_producer import Producer
+from src.models.user import User, AccountType
+from src.repositories.user_repository import UserRepository
+
+
+class InMemoryUserRepository(UserRepository):
+    def __init__(self, users: list[User] = ()):
+        self._by_id: dict[UUID, User] = {user.id: user for user in users}
+        self._by_email: dict[str, User] = {user.email.lower(): user for user in users}
+
+    async def create(self, user: User) -> User:
+        now = datetime.utcnow()
+        user.id = user.id or uuid.uuid4()
+        user.created_at = user.created_at or now
+        user.updated_at = user.updated_at or now
+        user.email_confirmed = bool(user.email_confirmed)
+        user.is_admin = bool(user.is_admin)
+        user.account_type = user.account_type or AccountType.PHYSICAL
+        self._by_id[user.id] = user
+        self._by_email[user.email.lower()] = user
+        return user
+
+    async def get(self, user_id: UUID | str) -> User | None:
+        if not isinstance(user_id, UUID):
+            user_id = UUID(str(user_id))
+        return self._by_id.get(user_id)
+
+    async def get_by_email(self, email: str) -> User | None:
+        return self._by_email.get(email.lower())
+
+    async def update(self, user_id: UUID, user: User) -> User:
+        user.updated_at = datetime.utcnow()
+        self._by_id[user.id] = user
+        self._by_email[user.email.lower()] = user
+        return user
+
+    async def delete(self, user_id: UUID) -> User | None:
+        user = self._by_id.pop(user_id, None)
+        if user:
+            self._by_email.pop(user.email.lower(), None)
+        return user
+
+
+class InMemoryProducer(Producer):
+    """Collects published messages in a shared outbox instead of sending them to a broker."""
+
+    def __init__(self, outbox: list):
+        self.outbox = outbox
+
+    async def connect(self):
+        pass
+
+    async def publish(self, message: dict[str, Any]):
+        self.outbox.append(message)
+
+    async def close(self):
+        pass
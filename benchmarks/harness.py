@@ -0,0 +1,238 @@
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from benchmarks.fakes import InMemoryUserRepository, InMemoryProducer
+from src.adapters.producers.factory import ProducerFactory
+from src.api import deps
+from src.core.config import get_settings
+from src.core.email_token import get_email_token_provider, InMemoryConsumedTokenStore, TokenPurpose
+from src.core.rate_limit import TokenBucketLimiter, SlidingWindowLimiter
+from src.repositories.user_repository import SqlaUserRepository
+from src.services.email_service import EmailService
+from src.services.login_throttle import LoginThrottle
+from src.services.user_service import UserService
+
+PASSWORD = 'benchmark-password'
+
+
+@dataclass
+class BenchUser:
+    email: str
+    id: str = ''
+    access_token: str = ''
+    refresh_token: str = ''
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    users: list[BenchUser]
+    outbox: list
+    rng: random.Random
+    counter: int = 0
+
+    def user(self) -> BenchUser:
+        return self.rng.choice(self.users)
+
+    def next_email(self) -> str:
+        self.counter += 1
+        return f'bench-{id(self)}-{self.counter}@example.com'
+
+
+@dataclass
+class ScenarioResult:
+    requests: int
+    errors: int
+    throughput_rps: float
+    p50_ms: float
+    p99_ms: float
+    alloc_peak_kib: float
+    status_codes: dict[str, int] = field(default_factory=dict)
+
+
+def install_overrides(app: FastAPI, outbox: list, postgres: bool = False,
+                      repository: InMemoryUserRepository | None = None):
+    """Swaps the broker (and the database, unless postgres is set) for in-memory fakes."""
+    producer_factory = ProducerFactory(InMemoryProducer, outbox=outbox)
+    # login attempts all come from one address and a small user pool, keep them unthrottled
+    throttle = LoginThrottle(SlidingWindowLimiter(10 ** 9, 60), TokenBucketLimiter(10 ** 9, 10 ** 9))
+    app.dependency_overrides[deps.get_login_throttle] = lambda: throttle
+
+    if postgres:
+        async def get_user_service(session=Depends(deps.get_session)):
+            return UserService(SqlaUserRepository(session), EmailService(producer_factory),
+                               deps.build_consumed_token_store(session), deps.get_audit_log())
+    else:
+        repository = repository or InMemoryUserRepository()
+        token_store = InMemoryConsumedTokenStore()
+
+        async def get_user_service():
+            return UserService(repository, EmailService(producer_factory), token_store)
+    app.dependency_overrides[deps.get_user_service] = get_user_service
+
+
+async def register(ctx: Context) -> httpx.Response:
+    return await ctx.client.post('/auth/register', json={
+        'name': 'Benchmark', 'email': ctx.next_email(), 'password': PASSWORD, 'account_type': 'physical',
+    })
+
+
+async def login(ctx: Context) -> httpx.Response:
+    return await ctx.client.post('/auth/login', data={'username': ctx.user().email, 'password': PASSWORD})
+
+
+async def refresh(ctx: Context) -> httpx.Response:
+    return await ctx.client.post('/auth/refresh', json={'refresh_token': ctx.user().refresh_token})
+
+
+async def me(ctx: Context) -> httpx.Response:
+    return await ctx.client.get('/users/me', headers={'Authorization': f'Bearer {ctx.user().access_token}'})
+
+
+async def forgot_password(ctx: Context) -> httpx.Response:
+    return await ctx.client.get('/auth/forgot-password', params={'email': ctx.user().email})
+
+
+async def confirm_email(ctx: Context) -> httpx.Response:
+    token = get_email_token_provider().encode(ctx.user().id, TokenPurpose.CONFIRM_EMAIL, 60 * 60)
+    return await ctx.client.get('/auth/confirm-email', params={'token': token})
+
+
+Scenario = Callable[[Context], Awaitable[httpx.Response]]
+
+SCENARIOS: dict[str, Scenario] = {
+    'register': register,
+    'login': login,
+    'refresh': refresh,
+    'me': me,
+    'forgot_password': forgot_password,
+    'confirm_email': confirm_email,
+}
+
+MIX_WEIGHTS = {'me': 40, 'login': 25, 'refresh': 15, 'register': 5, 'forgot_password': 10, 'confirm_email': 5}
+
+
+async def mix(ctx: Context) -> httpx.Response:
+    name = ctx.rng.choices(list(MIX_WEIGHTS), weights=list(MIX_WEIGHTS.values()))[0]
+    return await SCENARIOS[name](ctx)
+
+SCENARIOS['mix'] = mix
+
+
+async def seed_users(ctx: Context, count: int):
+    for _ in range(count):
+        user = BenchUser(email=ctx.next_email())
+        response = await ctx.client.post('/auth/register', json={
+            'name': 'Benchmark', 'email': user.email, 'password': PASSWORD, 'account_type': 'physical',
+        })
+        response.raise_for_status()
+        tokens = response.json()
+        user.access_token = tokens['access_token']
+        user.refresh_token = tokens['refresh_token']
+        me_response = await ctx.client.get('/users/me', headers={'Authorization': f'Bearer {user.access_token}'})
+        me_response.raise_for_status()
+        user.id = me_response.json()['id']
+        ctx.users.append(user)
+
+
+async def run_scenario(ctx: Context, scenario: Scenario, requests: int, concurrency: int,
+                       alloc_samples: int) -> ScenarioResult:
+    latencies = []
+    status_codes: dict[str, int] = {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await scenario(ctx)
+            latencies.append(time.perf_counter() - started)
+            code = str(response.status_code)
+            status_codes[code] = status_codes.get(code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    alloc_peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await scenario(ctx)
+            alloc_peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return ScenarioResult(
+        requests=requests,
+        errors=sum(count for code, count in status_codes.items() if code.startswith('5')),
+        throughput_rps=requests / elapsed,
+        p50_ms=statistics.median(latencies) * 1000,
+        p99_ms=latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        alloc_peak_kib=statistics.mean(alloc_peaks) / 1024 if alloc_peaks else 0.0,
+        status_codes=status_codes,
+    )
+
+
+@contextmanager
+def settings_overrides(**values):
+    """Overrides settings through the environment for the duration of the block.
+
+    The cached settings are dropped on entry and exit, so nothing outside the block
+    sees the overridden values.
+    """
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update({key: value if isinstance(value, str) else json.dumps(value) for key, value in values.items()})
+    get_settings.cache_clear()
+    try:
+        yield get_settings()
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        get_settings.cache_clear()
+
+
+async def run(app: FastAPI, scenarios: list[str], requests: int, concurrency: int, users: int,
+              alloc_samples: int, seed: int = 0, postgres: bool = False) -> dict[str, ScenarioResult]:
+    outbox = []
+    install_overrides(app, outbox, postgres=postgres)
+    store = 'database' if postgres else 'memory'
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    try:
+        with settings_overrides(WARMUP_DATABASE=postgres, WARMUP_BROKER=False, AUDIT_ENABLED=postgres,
+                                EMAIL_TOKEN_STORE=store, LOGIN_THROTTLE_BACKEND=store):
+            async with app.router.lifespan_context(app), \
+                    httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+                ctx = Context(client=client, users=[], outbox=outbox, rng=random.Random(seed))
+                await seed_users(ctx, users)
+                for name in scenarios:
+                    results[name] = await run_scenario(ctx, SCENARIOS[name], requests, concurrency, alloc_samples)
+                    outbox.clear()
+    finally:
+        app.dependency_overrides.clear()
+    return results
+
+
+def describe_environment() -> dict:
+    settings = get_settings()
+    return {
+        'password_scheme': settings.PASSWORD_HASH_SCHEME,
+        'bcrypt_rounds': settings.PASSWORD_BCRYPT_ROUNDS,
+    }
@@ -0,0 +1,114 @@
+"""Request volume and latency of the cacheable endpoints with and without HTTP caching.
+
+A browser-like client calls /users/me and the JWKS document repeatedly from a
+cross-origin page. Without caching it sends a preflight before every call and
+always gets the full body. With caching it reuses the preflight for its max_age
+and revalidates with If-None-Match. Also times the reset-password page render
+and the CORS origin check.
+
+Usage: python -m benchmarks.http_caching [calls]
+"""
+import asyncio
+import re
+import sys
+import time
+import timeit
+
+import httpx
+
+from benchmarks.harness import install_overrides, settings_overrides, PASSWORD
+
+ORIGIN = 'https://app.example.com'
+
+
+async def browse(client: httpx.AsyncClient, path: str, headers: dict, calls: int, cached: bool) -> dict:
+    sent = received = 0
+    preflight_cached = False
+    etag = None
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        if not (cached and preflight_cached):
+            response = await client.options(path, headers={
+                'Origin': ORIGIN, 'Access-Control-Request-Method': 'GET',
+                'Access-Control-Request-Headers': 'authorization',
+            })
+            sent += 1
+            received += len(response.content)
+            preflight_cached = int(response.headers.get('access-control-max-age', 0)) > 0
+        request_headers = {**headers, 'Origin': ORIGIN}
+        if cached and etag:
+            request_headers['If-None-Match'] = etag
+        response = await client.get(path, headers=request_headers)
+        latencies.append(time.perf_counter() - started)
+        sent += 1
+        received += len(response.content)
+        etag = response.headers.get('etag')
+    latencies.sort()
+    return {
+        'requests': sent,
+        'kib': received / 1024,
+        'p50_us': latencies[len(latencies) // 2] * 1e6,
+        'total_ms': sum(latencies) * 1000,
+    }
+
+
+def render_times(iterations: int = 20000) -> dict[str, float]:
+    from src.api.v1.auth import templates, reset_password_page
+    template = templates.get_template('reset-password.html')
+    page = reset_password_page()
+    token = 'a' * 200
+    return {
+        'reset page: jinja render': timeit.timeit(lambda: template.render(token=token).encode(),
+                                                  number=iterations) / iterations * 1e6,
+        'reset page: spliced': timeit.timeit(lambda: page.render(token), number=iterations) / iterations * 1e6,
+    }
+
+
+def origin_check_times(iterations: int = 200000) -> dict[str, float]:
+    pattern = re.compile('https?://.*')
+    allowlist = frozenset([ORIGIN, *(f'https://app{i}.example.com' for i in range(50))])
+    return {
+        'origin: regex fullmatch': timeit.timeit(lambda: pattern.fullmatch(ORIGIN),
+                                                 number=iterations) / iterations * 1e6,
+        'origin: set lookup': timeit.timeit(lambda: ORIGIN in allowlist, number=iterations) / iterations * 1e6,
+    }
+
+
+async def browse_endpoints(calls: int):
+    from src.main import create_app
+    app = create_app()
+    install_overrides(app, [])
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        response = await client.post('/auth/register', json={
+            'name': 'Benchmark', 'email': 'http-caching@example.com', 'password': PASSWORD,
+            'account_type': 'physical',
+        })
+        response.raise_for_status()
+        auth = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+        print(f'{calls} calls per endpoint')
+        print(f'{"endpoint":<32} {"requests":>9} {"KiB":>8} {"p50 us":>8} {"total ms":>9}')
+        for path, headers in (('/users/me', auth), ('/.well-known/jwks.json', {})):
+            for cached in (False, True):
+                result = await browse(client, path, headers, calls, cached)
+                name = f'{path} {"cached" if cached else "uncached"}'
+                print(f'{name:<32} {result["requests"]:>9} {result["kib"]:>8.1f} '
+                      f'{result["p50_us"]:>8.0f} {result["total_ms"]:>9.1f}')
+
+
+async def main(calls: int = 500):
+    with settings_overrides(WARMUP_DATABASE=False, WARMUP_BROKER=False, AUDIT_ENABLED=False,
+                            EMAIL_TOKEN_STORE='memory', LOGIN_THROTTLE_BACKEND='memory',
+                            CORS_ALLOW_ORIGINS=[ORIGIN]):
+        await browse_endpoints(calls)
+
+    print(f'\n{"operation":<28} {"us/op":>8}')
+    for name, us in {**render_times(), **origin_check_times()}.items():
+        print(f'{name:<28} {us:>8.2f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*map(int, sys.argv[1:2])))
@@ -0,0 +1,54 @@
+"""Fails if importing the app module gets slow or starts touching configuration.
+
+The import runs in a clean interpreter with none of the app's environment
+variables, so any Settings() or key loading at import time raises. The budget
+covers only the time spent in the app's own modules (the package of --module);
+third-party imports like fastapi are reported but vary too much between
+machines to fail on.
+
+Usage: python -m benchmarks.import_time [--budget-ms 150] [--module src.main]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+def measure(module: str) -> tuple[int, int, str]:
+    """Returns the cumulative import time of module and the time spent in its own package,
+    both in microseconds, and the slowest imports."""
+    env = {key: value for key, value in os.environ.items() if key in ('PATH', 'HOME', 'PYTHONPATH')}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=env)
+    if result.returncode:
+        raise SystemExit(f'Importing {module} failed:\n{result.stderr[-2000:]}')
+    package = module.partition('.')[0]
+    rows = []
+    own = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix('import time:').split('|')
+        rows.append((int(cumulative_us), name.rstrip()))
+        if name.strip() == package or name.strip().startswith(f'{package}.'):
+            own += int(self_us)
+    total = next(cumulative for cumulative, name in rows if name.strip() == module)
+    slowest = '\n'.join(f'{cumulative / 1000:8.1f} ms  {name}' for cumulative, name in sorted(rows, reverse=True)[:10])
+    return total, own, slowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='src.main')
+    parser.add_argument('--budget-ms', type=float, default=150, help="budget for the app's own modules")
+    args = parser.parse_args()
+
+    total, own, slowest = measure(args.module)
+    print(f'import {args.module}: {total / 1000:.1f} ms, '
+          f'{own / 1000:.1f} ms in its own modules (budget {args.budget_ms:.0f} ms)\n{slowest}')
+    if own / 1000 > args.budget_ms:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
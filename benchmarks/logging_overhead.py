@@ -0,0 +1,83 @@
+"""Time a log call costs the calling thread (the event loop, in the app).
+
+Compares a synchronous JSON handler with the queue handler from
+src.core.logging_config, writing to a file and to a slow sink that stands in
+for a congested stdout pipe.
+
+Usage: python -m benchmarks.logging_overhead [records]
+"""
+import logging
+import sys
+import tempfile
+import time
+
+from src.core.logging_config import configure_logging, JsonFormatter
+
+
+class SlowSink:
+    """File wrapper adding a fixed delay to every write."""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, data: str):
+        time.sleep(self.delay)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def per_call_us(logger: logging.Logger, records: int) -> float:
+    started = time.perf_counter()
+    for _ in range(records):
+        logger.info('Published message to queue %s', 'emails', extra={'message_type': 'email'})
+    return (time.perf_counter() - started) / records * 1e6
+
+
+def synchronous(logger: logging.Logger, stream, records: int) -> float:
+    root = logging.getLogger()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    try:
+        return per_call_us(logger, records)
+    finally:
+        root.removeHandler(handler)
+
+
+def queued(logger: logging.Logger, stream, records: int, sampling: dict[str, float] | None = None) -> float:
+    # the listener writes to stdout, point it at the stream instead
+    real_stdout, sys.stdout = sys.stdout, stream
+    try:
+        listener = configure_logging('INFO', json=True, queue_size=records * 2, sampling=sampling)
+        result = per_call_us(logger, records)
+        listener.stop()
+        return result
+    finally:
+        sys.stdout = real_stdout
+        for handler in logging.getLogger().handlers[:]:
+            logging.getLogger().removeHandler(handler)
+
+
+def main(records: int = 20000):
+    logger = logging.getLogger('src.adapters.producers.rabbitmq_producer')
+    logging.getLogger().setLevel(logging.INFO)
+    slow_records = max(1, records // 20)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.log') as output:
+        slow = SlowSink(output, delay=0.0002)
+        rows = [
+            ('file, synchronous handler', synchronous(logger, output, records)),
+            ('file, queue handler', queued(logger, output, records)),
+            ('file, queue handler, 10% sampled', queued(logger, output, records, {'src.adapters.producers': 0.1})),
+            ('slow sink, synchronous handler', synchronous(logger, slow, slow_records)),
+            ('slow sink, queue handler', queued(logger, slow, slow_records)),
+        ]
+    for name, value in rows:
+        print(f'{name:<34} {value:8.2f} us/call')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,96 @@
+"""End-to-end benchmark of the FastAPI app running in-process.
+
+Uses an in-memory user repository and broker by default (``--postgres`` keeps the
+configured database). Needs the same environment as the app plus ``httpx``.
+
+Usage:
+    python -m benchmarks.run --scenarios login,me --requests 500 --concurrency 16
+    python -m benchmarks.run --save-baseline main
+    python -m benchmarks.run --compare main
+"""
+import argparse
+import asyncio
+import json
+import platform
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from benchmarks.harness import SCENARIOS, run, describe_environment
+
+BASELINES_DIR = Path(__file__).parent / 'baselines'
+
+
+def print_results(results: dict[str, dict]):
+    print(f'{"scenario":<16} {"rps":>9} {"p50 ms":>9} {"p99 ms":>9} {"alloc KiB":>10} {"5xx":>5}')
+    for name, result in results.items():
+        print(f'{name:<16} {result["throughput_rps"]:>9.1f} {result["p50_ms"]:>9.2f} '
+              f'{result["p99_ms"]:>9.2f} {result["alloc_peak_kib"]:>10.1f} {result["errors"]:>5}')
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> bool:
+    """Prints the change against the baseline. Returns False if any scenario regressed past threshold %."""
+    ok = True
+    print(f'\n{"scenario":<16} {"rps":>9} {"p99":>9}')
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        rps_change = (result['throughput_rps'] / before['throughput_rps'] - 1) * 100
+        p99_change = (result['p99_ms'] / before['p99_ms'] - 1) * 100
+        regressed = rps_change < -threshold or p99_change > threshold
+        ok = ok and not regressed
+        print(f'{name:<16} {rps_change:>+8.1f}% {p99_change:>+8.1f}%{"  REGRESSION" if regressed else ""}')
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f'comma separated, available: {", ".join(SCENARIOS)}')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=20, help='users registered before the run')
+    parser.add_argument('--alloc-samples', type=int, default=20,
+                        help='sequential requests traced with tracemalloc after each scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--postgres', action='store_true', help='use the configured database')
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression in percent')
+    args = parser.parse_args()
+
+    from src.main import create_app
+    app = create_app()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    raw_results = asyncio.run(run(app, scenarios, args.requests, args.concurrency, args.users,
+                                  args.alloc_samples, seed=args.seed, postgres=args.postgres))
+    results = {name: asdict(result) for name, result in raw_results.items()}
+    print_results(results)
+
+    if args.save_baseline:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        path = BASELINES_DIR / f'{args.save_baseline}.json'
+        with open(path, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': time.time(),
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'args': vars(args),
+                    **describe_environment(),
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f'\nBaseline saved to {path}')
+
+    if args.compare:
+        with open(BASELINES_DIR / f'{args.compare}.json') as f:
+            baseline = json.load(f)
+        if not compare(results, baseline['results'], args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Time and allocations per response body for /users/me and /auth/login.
+
+Compares the previous path (from_orm, jsonable_encoder, stdlib json) with
+model_validate and the cached TypeAdapter serializers.
+
+Usage: python -m benchmarks.serialization [iterations]
+"""
+import json
+import sys
+import timeit
+import tracemalloc
+import uuid
+import warnings
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from src.models.user import User, AccountType
+from src.schemas.serialization import dump_json
+from src.schemas.token import FullToken
+from src.schemas.user import UserOut
+
+
+def stdlib_json(content) -> bytes:
+    # what starlette's JSONResponse.render does
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode()
+
+
+def allocations(func, repeat: int = 200) -> float:
+    tracemalloc.start()
+    try:
+        func()
+        total = 0
+        for _ in range(repeat):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            func()
+            total += tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return total / repeat
+
+
+def main(iterations: int = 20000):
+    now = datetime.utcnow()
+    user = User(id=uuid.uuid4(), name='Benchmark', password='hash', email='bench@example.com',
+                email_confirmed=True, created_at=now, updated_at=now,
+                account_type=AccountType.PHYSICAL, is_admin=False)
+    token = FullToken(access_token='a' * 500, refresh_token='r' * 500, token_type='Bearer')
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+    cases = {
+        'me: from_orm + jsonable_encoder': lambda: stdlib_json(jsonable_encoder(UserOut.from_orm(user))),
+        'me: model_validate + dump_json': lambda: dump_json(UserOut, UserOut.model_validate(user)),
+        'login: jsonable_encoder': lambda: stdlib_json(jsonable_encoder(token)),
+        'login: dump_json': lambda: dump_json(FullToken, token),
+    }
+    print(f'{"case":<36} {"us/op":>8} {"alloc B/op":>11}')
+    for name, func in cases.items():
+        elapsed = timeit.timeit(func, number=iterations)
+        print(f'{name:<36} {elapsed / iterations * 1e6:>8.2f} {allocations(func):>11.0f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,32 @@
+"""App factory for benchmarking real server processes without a database or broker.
+
+Every worker gets its own in-memory repository seeded with the same user, so
+tokens issued by one worker are accepted by all of them.
+"""
+import uuid
+from datetime import datetime
+
+from fastapi import FastAPI
+
+from benchmarks.fakes import InMemoryUserRepository
+from benchmarks.harness import install_overrides, PASSWORD
+from src.core.config import get_settings
+from src.core.security import hash_password, configure_password_hashing, configured_params
+from src.main import create_app as create_main_app
+from src.models.user import User, AccountType
+
+BENCH_USER_ID = uuid.UUID('00000000-0000-4000-8000-000000000001')
+BENCH_USER_EMAIL = 'bench-user@example.com'
+
+
+def create_app() -> FastAPI:
+    app = create_main_app()
+    scheme = get_settings().PASSWORD_HASH_SCHEME
+    # hash the seeded password with the configured cost, the lifespan has not run yet
+    configure_password_hashing(scheme, **configured_params(scheme))
+    now = datetime.utcnow()
+    repository = InMemoryUserRepository([User(
+        id=BENCH_USER_ID, name='Benchmark', email=BENCH_USER_EMAIL, password=hash_password(PASSWORD),
+        email_confirmed=True, created_at=now, updated_at=now, account_type=AccountType.PHYSICAL, is_admin=False)])
+    install_overrides(app, outbox=[], repository=repository)
+    return app
@@ -0,0 +1,123 @@
+"""Insert and email lookup cost of the users table before and after the 8e4b7c2a9d15 indexes.
+
+Builds both layouts side by side in a scratch schema of the configured database,
+inserts the same rows one statement at a time (as registration does) and looks
+them up by email. The schema is dropped afterwards.
+
+Usage: python -m benchmarks.users_table [rows] [lookups]
+"""
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+from src.db.database import get_engine, dispose_engine
+
+SCHEMA = 'bench_users_table'
+COLUMNS = '''
+    id uuid PRIMARY KEY,
+    name varchar NOT NULL,
+    password varchar NOT NULL,
+    email varchar(70) NOT NULL,
+    email_confirmed boolean NOT NULL,
+    created_at timestamp,
+    updated_at timestamp,
+    account_type varchar NOT NULL,
+    is_admin boolean NOT NULL
+'''
+LAYOUTS = {
+    'before': {
+        'ddl': [
+            f'CREATE TABLE {SCHEMA}.before ({COLUMNS}, UNIQUE (email))',
+            f'CREATE UNIQUE INDEX before_ix_users_id ON {SCHEMA}.before (id)',
+        ],
+        'lookup': f'SELECT * FROM {SCHEMA}.before WHERE email = :email',
+    },
+    'after': {
+        'ddl': [
+            f'CREATE TABLE {SCHEMA}.after ({COLUMNS})',
+            f'CREATE UNIQUE INDEX after_ix_users_email_lower ON {SCHEMA}.after (lower(email))',
+            f'CREATE INDEX after_ix_users_unconfirmed_created_at ON {SCHEMA}.after (created_at) '
+            f'WHERE email_confirmed = false',
+        ],
+        'lookup': f'SELECT * FROM {SCHEMA}.after WHERE lower(email) = lower(:email)',
+    },
+}
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def bench_layout(connection, name: str, layout: dict, rows: list[dict], lookups: list[str]) -> dict:
+    for statement in layout['ddl']:
+        await connection.execute(text(statement))
+
+    insert = text(f'INSERT INTO {SCHEMA}.{name} VALUES (:id, :name, :password, :email, :email_confirmed, '
+                  f':created_at, :updated_at, :account_type, :is_admin)')
+    insert_times = []
+    for row in rows:
+        started = time.perf_counter()
+        await connection.execute(insert, row)
+        insert_times.append(time.perf_counter() - started)
+    await connection.execute(text(f'ANALYZE {SCHEMA}.{name}'))
+
+    lookup = text(layout['lookup'])
+    lookup_times = []
+    for email in lookups:
+        started = time.perf_counter()
+        (await connection.execute(lookup, {'email': email})).first()
+        lookup_times.append(time.perf_counter() - started)
+
+    plan = (await connection.execute(text(f'EXPLAIN {layout["lookup"]}'), {'email': lookups[0]})).scalars().first()
+    index_bytes = (await connection.execute(
+        text('SELECT pg_indexes_size(:table)'), {'table': f'{SCHEMA}.{name}'})).scalar()
+    return {
+        'insert_us': sum(insert_times) / len(insert_times) * 1e6,
+        'insert_p99_us': percentile(insert_times, 0.99) * 1e6,
+        'lookup_us': sum(lookup_times) / len(lookup_times) * 1e6,
+        'lookup_p99_us': percentile(lookup_times, 0.99) * 1e6,
+        'index_kib': index_bytes / 1024,
+        'plan': plan.strip(),
+    }
+
+
+async def main(rows_count: int = 20000, lookups_count: int = 5000):
+    now = datetime.utcnow()
+    rows = [{
+        'id': uuid.uuid4(), 'name': 'Benchmark', 'password': 'x' * 60, 'email': f'user{i}@example.com',
+        'email_confirmed': i % 10 != 0, 'created_at': now, 'updated_at': now,
+        'account_type': 'PHYSICAL', 'is_admin': False,
+    } for i in range(rows_count)]
+    rng = random.Random(0)
+    lookups = [rng.choice(rows)['email'] for _ in range(lookups_count)]
+
+    results = {}
+    async with get_engine().connect() as connection:
+        await connection.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+        await connection.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+        await connection.commit()
+        try:
+            for name, layout in LAYOUTS.items():
+                results[name] = await bench_layout(connection, name, layout, rows, lookups)
+                await connection.commit()
+        finally:
+            await connection.rollback()
+            await connection.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+            await connection.commit()
+    await dispose_engine()
+
+    print(f'{rows_count} rows, {lookups_count} lookups')
+    print(f'{"layout":<8} {"insert us":>10} {"p99":>8} {"lookup us":>10} {"p99":>8} {"index KiB":>10}  plan')
+    for name, result in results.items():
+        print(f'{name:<8} {result["insert_us"]:>10.1f} {result["insert_p99_us"]:>8.1f} '
+              f'{result["lookup_us"]:>10.1f} {result["lookup_p99_us"]:>8.1f} {result["index_kib"]:>10.1f}  '
+              f'{result["plan"]}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*map(int, sys.argv[1:3])))
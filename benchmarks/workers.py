@@ -0,0 +1,94 @@
+"""Requests per second of the production server (src/serve.py) by worker count.
+
+Starts the server with the in-memory app from benchmarks/server.py for each
+worker count and drives it over HTTP.
+
+Usage: python -m benchmarks.workers --workers 1,2,4 --scenario login --duration 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.harness import PASSWORD
+from benchmarks.server import BENCH_USER_EMAIL
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get('/health/ready')).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError('Server did not become ready')
+
+
+async def drive(base_url: str, scenario: str, concurrency: int, duration: float) -> tuple[int, int, int]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await wait_ready(client)
+        tokens = (await client.post('/auth/login', data={'username': BENCH_USER_EMAIL, 'password': PASSWORD})).json()
+
+        async def request() -> httpx.Response:
+            if scenario == 'login':
+                return await client.post('/auth/login', data={'username': BENCH_USER_EMAIL, 'password': PASSWORD})
+            if scenario == 'refresh':
+                return await client.post('/auth/refresh', json={'refresh_token': tokens['refresh_token']})
+            return await client.get('/users/me', headers={'Authorization': f'Bearer {tokens["access_token"]}'})
+
+        completed = shed = errors = 0
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            nonlocal completed, shed, errors
+            while time.monotonic() < deadline:
+                response = await request()
+                if response.status_code == 503:
+                    # rejected by admission control, back off like a client honouring Retry-After would
+                    shed += 1
+                    await asyncio.sleep(0.05)
+                elif response.status_code >= 500:
+                    errors += 1
+                else:
+                    completed += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return completed, shed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='comma separated worker counts')
+    parser.add_argument('--scenario', choices=['login', 'refresh', 'me'], default='login')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    # the benchmark app has no database, so every worker keeps its own throttle and token store
+    env = {**os.environ, 'WARMUP_DATABASE': 'false', 'WARMUP_BROKER': 'false', 'AUDIT_ENABLED': 'false',
+           'EMAIL_TOKEN_STORE': 'memory', 'LOGIN_THROTTLE_BACKEND': 'memory'}
+    print(f'{"workers":>7} {"rps":>9} {"shed":>6} {"errors":>6}')
+    for workers in [int(value) for value in args.workers.split(',')]:
+        server = subprocess.Popen([sys.executable, '-m', 'src.serve', '--app', 'benchmarks.server:create_app',
+                                   '--host', '127.0.0.1', '--port', str(args.port), '--workers', str(workers),
+                                   '--allow-per-worker-state'],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            completed, shed, errors = asyncio.run(drive(f'http://127.0.0.1:{args.port}', args.scenario,
+                                                  args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f'{workers:>7} {completed / args.duration:>9.1f} {shed:>6} {errors:>6}')
+
+
+if __name__ == '__main__':
+    main()
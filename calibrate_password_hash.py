@@ -0,0 +1,24 @@
+import argparse
+
+from src.core.config import get_settings
+from src.core.security import calibrate, configured_params
+
+ENV_NAMES = {
+    'rounds': 'PASSWORD_BCRYPT_ROUNDS',
+    'time_cost': 'PASSWORD_ARGON2_TIME_COST',
+    'memory_cost': 'PASSWORD_ARGON2_MEMORY_COST',
+    'parallelism': 'PASSWORD_ARGON2_PARALLELISM',
+}
+
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description='Pick password hash cost for the target verify latency on this machine')
+    parser.add_argument('--scheme', choices=['bcrypt', 'argon2'], default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument('--target-ms', type=int, default=settings.PASSWORD_HASH_TARGET_MS)
+    args = parser.parse_args()
+
+    params = calibrate(args.scheme, args.target_ms / 1000, **configured_params(args.scheme))
+    print(f'PASSWORD_HASH_SCHEME={args.scheme}')
+    for name, value in params.items():
+        if value:
+            print(f'{ENV_NAMES[name]}={value}')
@@ -23,9 +23,10 @@ if config.config_file_name is not None:
 from src.models import *
 
 from src.db.database import Base
-from src.core.config import settings
+from src.core.config import get_settings
+from src.repositories.audit_repository import PARTITION_PREFIX
 
-db_url = settings.DB_URL
+db_url = get_settings().DB_URL
 target_metadata = Base.metadata
 
 config.set_main_option('sqlalchemy.url', db_url)
@@ -36,6 +37,11 @@ config.set_main_option('sqlalchemy.url', db_url)
 # ... etc.
 
 
+def include_name(name, type_, parent_names) -> bool:
+    # partitions of auth_events are managed by the app
+    return not (type_ == 'table' and name.startswith(PARTITION_PREFIX))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -52,6 +58,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -61,7 +68,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
 
     with context.begin_transaction():
         context.run_migrations()
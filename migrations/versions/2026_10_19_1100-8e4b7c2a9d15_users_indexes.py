@@ -0,0 +1,56 @@
+"""users indexes
+
+Drops ix_users_id, which duplicates the primary key, and replaces the
+case-sensitive unique constraint on email with a unique index on lower(email).
+Indexes are built and dropped CONCURRENTLY so writes to users are not blocked;
+only dropping users_email_key takes a short exclusive lock.
+
+Revision ID: 8e4b7c2a9d15
+Revises: 5c2d8e1f7a93
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4b7c2a9d15"
+down_revision: Union[str, None] = "5c2d8e1f7a93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT lower(email) FROM users GROUP BY lower(email) HAVING count(*) > 1 LIMIT 10"
+    )).scalars().all()
+    if duplicates:
+        # a failed concurrent build would leave an invalid index behind
+        raise RuntimeError(f"users differing only in email case must be merged first: {duplicates}")
+
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # a previous run interrupted mid-build leaves an invalid index with the same name
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_lower")
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY ix_users_email_lower ON users (lower(email))")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_unconfirmed_created_at")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_users_unconfirmed_created_at ON users (created_at) "
+            "WHERE email_confirmed = false"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_id")
+
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.drop_constraint("users_email_key", "users", type_="unique")
+
+
+def downgrade() -> None:
+    op.create_unique_constraint("users_email_key", "users", ["email"])
+    with op.get_context().autocommit_block():
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_users_id ON users (id)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_unconfirmed_created_at")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_lower")
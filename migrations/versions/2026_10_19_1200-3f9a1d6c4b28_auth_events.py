@@ -0,0 +1,41 @@
+"""auth events
+
+Revision ID: 3f9a1d6c4b28
+Revises: 8e4b7c2a9d15
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a1d6c4b28"
+down_revision: Union[str, None] = "8e4b7c2a9d15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # daily partitions are created and dropped by the app, see SqlaAuditRepository
+    op.create_table(
+        "auth_events",
+        sa.Column("occurred_at", sa.DateTime(), nullable=False),
+        sa.Column("event", sa.String(length=32), nullable=False),
+        sa.Column("success", sa.Boolean(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=True),
+        sa.Column("email", sa.VARCHAR(length=70), nullable=True),
+        sa.Column("client_ip", sa.String(length=45), nullable=True),
+        sa.Column("detail", sa.String(length=64), nullable=True),
+        postgresql_partition_by="RANGE (occurred_at)",
+    )
+    op.create_index("ix_auth_events_user_id_occurred_at", "auth_events", ["user_id", "occurred_at"])
+    op.create_index("ix_auth_events_email_occurred_at", "auth_events", [sa.text("lower(email)"), "occurred_at"])
+
+
+def downgrade() -> None:
+    # drops the partitions as well
+    op.drop_table("auth_events")
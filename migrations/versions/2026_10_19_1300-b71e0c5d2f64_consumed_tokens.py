@@ -0,0 +1,34 @@
+"""consumed tokens
+
+Revision ID: b71e0c5d2f64
+Revises: 3f9a1d6c4b28
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b71e0c5d2f64"
+down_revision: Union[str, None] = "3f9a1d6c4b28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "consumed_tokens",
+        sa.Column("nonce", sa.LargeBinary(), nullable=False),
+        sa.Column("expires_at", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("nonce"),
+    )
+    op.create_index(op.f("ix_consumed_tokens_expires_at"), "consumed_tokens", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_consumed_tokens_expires_at"), table_name="consumed_tokens")
+    op.drop_table("consumed_tokens")
@@ -7,8 +7,23 @@ class ProducerFactory:
                  **kwargs):
         self._class = _class
         self._kwargs = kwargs
+        self._producer = None
+
+    async def start(self):
+        """Opens a producer that is shared by all publishers until close()."""
+        producer = self._class(**self._kwargs)
+        await producer.connect()
+        self._producer = producer
+
+    async def close(self):
+        if self._producer is not None:
+            producer, self._producer = self._producer, None
+            await producer.close()
 
     @asynccontextmanager
     async def get_publisher(self):
+        if self._producer is not None:
+            yield self._producer
+            return
         async with self._class(**self._kwargs) as producer:
             yield producer
@@ -6,9 +6,16 @@ from typing import Any
 
 import aio_pika
 
+from src.core.metrics import registry, timed
+
 logger = logging.getLogger(__name__)
 
 
+def _broker_timer(operation: str):
+    return timed(registry.histogram('broker_seconds', 'Time spent talking to the message broker',
+                                    broker='rabbitmq', operation=operation))
+
+
 class Producer(ABC):
     @abstractmethod
     async def publish(self, message):
@@ -38,17 +45,19 @@ class RabbitMQProducer(Producer):
         self.channel = None
         self.queue = None
 
+    @_broker_timer('connect')
     async def connect(self):
         try:
             self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
             self.channel = await self.connection.channel()
             await self.channel.set_qos(prefetch_count=10)
             self.queue = await self.channel.declare_queue(self.queue_name, durable=True)
-            logger.info(f"Connected to RabbitMQ and declared queue '{self.queue_name}'")
+            logger.info("Connected to RabbitMQ and declared queue '%s'", self.queue_name)
         except Exception as e:
-            logger.error(f"Failed to connect to RabbitMQ: {e}")
+            logger.error("Failed to connect to RabbitMQ: %s", e)
             raise e
 
+    @_broker_timer('publish')
     async def publish(self, message: dict[str, Any]):
         if not self.channel:
             raise ConnectionError("RabbitMQ channel is not initialized")
@@ -59,7 +68,8 @@ class RabbitMQProducer(Producer):
             ),
             routing_key=self.queue_name
         )
-        logger.info(f"Published message to queue '{self.queue_name}': {message}")
+        logger.info("Published message to queue '%s'", self.queue_name,
+                    extra={'message_type': message.get('type'), 'template_id': message.get('template_id')})
 
     async def close(self):
         if self.connection:
@@ -0,0 +1,45 @@
+import hashlib
+
+from jinja2 import Template
+from markupsafe import Markup, escape
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b('\x1f'.join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match, as RFC 9110 requires for GET and HEAD."""
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(candidate.strip().removeprefix('W/') == etag for candidate in if_none_match.split(','))
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+class SplicedTemplate:
+    """Renders a template once with a marker in place of one variable.
+
+    Later renders only splice the escaped value into the pre-rendered pieces, so
+    the output is the same as a full render without running the template again.
+    """
+    _marker = '\x00splice\x00'
+
+    def __init__(self, template: Template, variable: str, **context):
+        rendered = template.render(**context, **{variable: Markup(self._marker)})
+        autoescape = template.environment.autoescape
+        self._autoescape = autoescape(template.name) if callable(autoescape) else autoescape
+        self._parts = [part.encode() for part in rendered.split(self._marker)]
+
+    def render(self, value: str) -> bytes:
+        if self._autoescape:
+            value = escape(value)
+        return str(value).encode().join(self._parts)
@@ -1,3 +1,6 @@
+import math
+from functools import cache
+
 from fastapi import HTTPException
 from fastapi.params import Depends
 from fastapi.security import OAuth2PasswordBearer
@@ -7,19 +10,26 @@ from starlette import status
 
 from src.adapters.producers.factory import ProducerFactory
 from src.adapters.producers.rabbitmq_producer import RabbitMQProducer
-from src.core.config import settings
-from src.db.database import AsyncSessionFactory
+from src.core.config import get_settings
+from src.core.email_token import ConsumedTokenStore, InMemoryConsumedTokenStore, SqlaConsumedTokenStore
+from src.core.metrics import MultiprocessMetrics, registry
+from src.core.profiling import ProfileStore
+from src.core.rate_limit import SlidingWindowLimiter, TokenBucketLimiter, SqlaSlidingWindowLimiter
+from src.db.database import get_session_factory, get_engine
 from src.exceptions.user import AuthorizationException
+from src.repositories.audit_repository import SqlaAuditRepository
 from src.repositories.user_repository import SqlaUserRepository
 from src.schemas.user import UserOut
+from src.services.audit_log import AuditLog
 from src.services.email_service import EmailService
+from src.services.login_throttle import LoginThrottle
 from src.services.user_service import UserService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/auth/login')
 
 
 async def get_session() -> AsyncSession:
-    async with AsyncSessionFactory() as session:
+    async with get_session_factory()() as session:
         try:
             yield session
             await session.commit()
@@ -32,10 +42,27 @@ async def get_session() -> AsyncSession:
 async def get_user_service(session: AsyncSession = Depends(get_session)):
     repository = SqlaUserRepository(session)
     email_service = get_email_service()
-    return UserService(repository, email_service)
+    return UserService(repository, email_service, build_consumed_token_store(session), get_audit_log())
+
+def build_consumed_token_store(session: AsyncSession) -> ConsumedTokenStore:
+    if get_settings().EMAIL_TOKEN_STORE == 'database':
+        # consumed in the request's transaction, with the change the token authorises
+        return SqlaConsumedTokenStore(session)
+    return get_memory_token_store()
+
+@cache
+def get_memory_token_store() -> InMemoryConsumedTokenStore:
+    # only safe with a single worker process and replica
+    return InMemoryConsumedTokenStore()
 
 def get_email_service():
-    return EmailService(producer_factory)
+    return EmailService(get_producer_factory())
+
+def get_profile_store() -> ProfileStore:
+    profile_store = build_profile_store()
+    if profile_store is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    return profile_store
 
 async def get_current_user(token: str = Depends(oauth2_scheme),
                            user_service: UserService = Depends(get_user_service)) -> UserOut:
@@ -59,6 +86,57 @@ async def get_current_admin(token: str = Depends(oauth2_scheme),
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough privileges")
     return user
 
-producer_factory = ProducerFactory(RabbitMQProducer,
-                                   rabbitmq_url=settings.RABBITMQ_URL,
-                                   queue_name=settings.RABBITMQ_QUEUE)
\ No newline at end of file
+
+@cache
+def get_producer_factory() -> ProducerFactory:
+    settings = get_settings()
+    return ProducerFactory(RabbitMQProducer,
+                           rabbitmq_url=settings.RABBITMQ_URL,
+                           queue_name=settings.RABBITMQ_QUEUE)
+
+
+@cache
+def get_login_throttle() -> LoginThrottle:
+    settings = get_settings()
+    if settings.LOGIN_THROTTLE_BACKEND == 'database':
+        ip_window = math.ceil(settings.LOGIN_IP_BURST / settings.LOGIN_IP_REFILL_RATE)
+        return LoginThrottle(
+            SqlaSlidingWindowLimiter(get_session_factory(), settings.LOGIN_EMAIL_ATTEMPTS,
+                                     settings.LOGIN_EMAIL_WINDOW, prefix='login:email:'),
+            SqlaSlidingWindowLimiter(get_session_factory(), settings.LOGIN_IP_BURST,
+                                     ip_window, prefix='login:ip:'),
+        )
+    return LoginThrottle(
+        SlidingWindowLimiter(settings.LOGIN_EMAIL_ATTEMPTS, settings.LOGIN_EMAIL_WINDOW,
+                             max_keys=settings.RATE_LIMIT_MAX_KEYS),
+        TokenBucketLimiter(settings.LOGIN_IP_BURST, settings.LOGIN_IP_REFILL_RATE,
+                           max_keys=settings.RATE_LIMIT_MAX_KEYS),
+    )
+
+
+@cache
+def build_profile_store() -> ProfileStore | None:
+    settings = get_settings()
+    if not settings.PROFILING_ENABLED:
+        return None
+    return ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+@cache
+def get_audit_log() -> AuditLog | None:
+    settings = get_settings()
+    if not settings.AUDIT_ENABLED:
+        return None
+    return AuditLog(SqlaAuditRepository(get_engine()),
+                    batch_size=settings.AUDIT_BATCH_SIZE,
+                    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+                    max_buffer=settings.AUDIT_MAX_BUFFER,
+                    retention_days=settings.AUDIT_RETENTION_DAYS,
+                    partitions_ahead=settings.AUDIT_PARTITIONS_AHEAD)
+
+
+@cache
+def get_multiprocess_metrics() -> MultiprocessMetrics | None:
+    directory = get_settings().METRICS_MULTIPROCESS_DIR
+    if directory is None:
+        return None
+    return MultiprocessMetrics(registry, directory)
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import math
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from fastapi import APIRouter
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from src.core.metrics import registry
+
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+@dataclass(frozen=True)
+class AdmissionPolicy:
+    name: str
+    max_concurrency: int
+    max_queue: int
+    queue_timeout: float  # seconds a request may wait for a slot
+
+
+@dataclass(frozen=True)
+class AdmissionRule:
+    policy: AdmissionPolicy
+    router: APIRouter
+    paths: tuple[str, ...] = field(default=())  # relative to the router prefix, all routes if empty
+
+    def resolve(self) -> list[BaseRoute]:
+        if not self.paths:
+            return list(self.router.routes)
+        paths = {self.router.prefix + path for path in self.paths}
+        return [route for route in self.router.routes if route.path in paths]
+
+
+class Rejected(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, policy: AdmissionPolicy):
+        self.policy = policy
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._service_time = 0.0  # moving average of time spent holding a slot
+        self._queue_wait = registry.histogram('admission_queue_wait_seconds',
+                                              'Time requests spent waiting for an admission slot',
+                                              buckets=QUEUE_WAIT_BUCKETS, route_class=policy.name)
+        self._rejected = registry.counter('admission_rejected', 'Requests shed by admission control',
+                                          route_class=policy.name)
+
+    def expected_wait(self) -> float:
+        return self._service_time * (len(self._waiters) + 1) / self.policy.max_concurrency
+
+    async def acquire(self):
+        if self.in_flight < self.policy.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self._queue_wait.observe(0)
+            return
+        expected_wait = self.expected_wait()
+        if len(self._waiters) >= self.policy.max_queue or expected_wait > self.policy.queue_timeout:
+            self._rejected.inc()
+            raise Rejected(expected_wait)
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.policy.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            self._rejected.inc()
+            raise Rejected(self.expected_wait())
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over right before cancellation
+                self.release()
+            raise
+        self._queue_wait.observe(time.perf_counter() - started)
+
+    def release(self, service_time: float | None = None):
+        if service_time is not None:
+            self._service_time += (service_time - self._service_time) * 0.1
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # hand the slot over without decrementing in_flight
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _remove(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+class AdmissionControlMiddleware:
+    """Limits concurrency per route class and sheds requests that would wait past their deadline."""
+
+    def __init__(self, app: ASGIApp, rules: list[AdmissionRule]):
+        self.app = app
+        # routes without path parameters are looked up by the request path,
+        # templated ones like /users/{id} are matched with their route regex
+        self._controllers: dict[str, AdmissionController] = {}
+        self._templated: list[tuple[re.Pattern, AdmissionController]] = []
+        templated_paths = set()
+        by_policy: dict[AdmissionPolicy, AdmissionController] = {}
+        for rule in rules:
+            controller = by_policy.setdefault(rule.policy, AdmissionController(rule.policy))
+            for route in rule.resolve():
+                if route.param_convertors:
+                    if route.path not in templated_paths:
+                        templated_paths.add(route.path)
+                        self._templated.append((route.path_regex, controller))
+                else:
+                    self._controllers.setdefault(route.path, controller)
+
+    def _controller(self, path: str) -> AdmissionController | None:
+        controller = self._controllers.get(path)
+        if controller is None:
+            for path_regex, templated_controller in self._templated:
+                if path_regex.match(path):
+                    return templated_controller
+        return controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        controller = self._controller(scope['path']) if scope['type'] == 'http' else None
+        if controller is None or scope['method'] == 'OPTIONS':
+            await self.app(scope, receive, send)
+            return
+        try:
+            await controller.acquire()
+        except Rejected as e:
+            await self._reject(send, e.retry_after)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.perf_counter() - started)
+
+    @staticmethod
+    async def _reject(send: Send, retry_after: float):
+        body = json.dumps({'detail': 'Service is overloaded, retry later'}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
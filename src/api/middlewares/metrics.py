@@ -0,0 +1,51 @@
+import time
+
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from src.core.metrics import registry, Histogram, Counter
+
+
+class RequestMetricsMiddleware:
+    """Records latency and response status per route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._latency: dict[tuple[str, str], Histogram] = {}
+        self._responses: dict[tuple[str, str, int], Counter] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            path = route.path if route is not None else 'unmatched'
+            self._histogram(scope['method'], path).observe(time.perf_counter() - started)
+            self._counter(scope['method'], path, status_code).inc()
+
+    def _histogram(self, method: str, path: str) -> Histogram:
+        histogram = self._latency.get((method, path))
+        if histogram is None:
+            histogram = self._latency[(method, path)] = registry.histogram(
+                'http_request_duration_seconds', 'HTTP request latency by route',
+                method=method, route=path)
+        return histogram
+
+    def _counter(self, method: str, path: str, status_code: int) -> Counter:
+        counter = self._responses.get((method, path, status_code))
+        if counter is None:
+            counter = self._responses[(method, path, status_code)] = registry.counter(
+                'http_responses', 'HTTP responses by route and status',
+                method=method, route=path, status=status_code)
+        return counter
@@ -0,0 +1,57 @@
+import asyncio
+import hmac
+import random
+import uuid
+
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from src.core.profiling import RequestProfile, ProfileStore
+
+PROFILE_HEADER = b'x-profile-token'
+
+
+class ProfilingMiddleware:
+    """Profiles a sampled fraction of requests and requests carrying the profiling token.
+
+    Only added to the app when profiling is enabled. cProfile sees every coroutine
+    running on the event loop while the request is in flight, so only one request
+    is profiled at a time.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore, sample_rate: float, token: str | None):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self._token = token.encode() if token else None
+        self._active = False
+
+    def _selected(self, scope: Scope) -> bool:
+        if self._active:
+            return False
+        if self._token:
+            for name, value in scope['headers']:
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value, self._token)
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(uuid.uuid4().hex[:16], scope['method'], scope['path'])
+
+        async def send_wrapper(message: Message):
+            if message['type'] == 'http.response.start':
+                profile.status = message['status']
+                message['headers'] = [*message.get('headers', []), (b'x-profile-id', profile.id.encode())]
+            await send(message)
+
+        self._active = True
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop()
+            self._active = False
+            await asyncio.to_thread(self.store.save, profile.to_dict())
@@ -1,51 +1,77 @@
 import os
+from functools import cache
 
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import EmailStr
 from starlette import status
 from fastapi import APIRouter, Depends, HTTPException
+from starlette.responses import HTMLResponse
 from starlette.templating import Jinja2Templates
 from fastapi import Request
 
 from src.api import deps
-from src.api.deps import get_user_service, get_current_user
+from src.api.caching import SplicedTemplate
+from src.api.deps import get_user_service, get_current_user, get_current_admin, get_login_throttle
 from src.exceptions.base import CloudsellIDException
+from src.exceptions.throttle import TooManyAttempts
 from src.exceptions.user import UserNotFound, AlreadyConfirmed, AuthorizationException, AuthenticationException
-from src.schemas.token import FullToken, RefreshTokenRequest, ResetPasswordRequest
+from src.schemas.serialization import ModelResponse
+from src.schemas.token import FullToken, RefreshTokenRequest, ResetPasswordRequest, Token
 from src.schemas.user import UserCreate, UserOut
+from src.services.login_throttle import LoginThrottle
 from src.services.user_service import UserService
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
 
 
+@cache
+def reset_password_page() -> SplicedTemplate:
+    return SplicedTemplate(templates.get_template('reset-password.html'), 'token')
+
+
 @router.post('/register', response_model=FullToken)
 async def register_user(user_data: UserCreate,
                         user_service: UserService = Depends(deps.get_user_service)):
     try:
         token = await user_service.create(user_data)
-        return token
+        return ModelResponse(token)
     except CloudsellIDException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-@router.post('/login')
-async def login(form_data: OAuth2PasswordRequestForm = Depends(),
-                user_service: UserService = Depends(get_user_service)):
+@router.post('/login', response_model=FullToken)
+async def login(request: Request,
+                form_data: OAuth2PasswordRequestForm = Depends(),
+                user_service: UserService = Depends(get_user_service),
+                throttle: LoginThrottle = Depends(get_login_throttle)):
     email = form_data.username
     password = form_data.password
+    client_ip = request.client.host if request.client else None
     try:
-        token = await user_service.authenticate_user(email, password)
-        return token
-    except CloudsellIDException as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+        await throttle.check(email, client_ip)
+    except TooManyAttempts as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e),
+                            headers={'Retry-After': str(e.retry_after)})
+    try:
+        token = await user_service.authenticate_user(email, password, client_ip)
+        return ModelResponse(token)
+    except CloudsellIDException:
+        # same answer for unknown emails and wrong passwords, so accounts can't be enumerated
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Incorrect email or password')
+
 
+@router.get('/login/throttle-stats')
+async def get_login_throttle_stats(admin: UserOut = Depends(get_current_admin),
+                                   throttle: LoginThrottle = Depends(get_login_throttle)):
+    return throttle.stats()
 
-@router.post('/refresh')
+
+@router.post('/refresh', response_model=Token)
 async def refresh_access_token(request: RefreshTokenRequest,
                                user_service: UserService = Depends(get_user_service)):
     try:
-        return await user_service.refresh_token(request.refresh_token)
+        return ModelResponse(await user_service.refresh_token(request.refresh_token))
     except CloudsellIDException as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
@@ -63,22 +89,23 @@ async def reset_password(email: EmailStr,
 async def reset_password(request: ResetPasswordRequest,
                          user_service: UserService = Depends(get_user_service)):
     try:
-        return await user_service.reset_password(request.password, request.token)
+        return ModelResponse(await user_service.reset_password(request.password, request.token))
     except AuthenticationException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-@router.get('/reset-password/page')
-async def get_reset_password_page(request: Request, token: str):
-    return templates.TemplateResponse("reset-password.html", {"request": request, "token": token})
+@router.get('/reset-password/page', response_class=HTMLResponse)
+async def get_reset_password_page(token: str):
+    # the page embeds a password reset token, browsers and proxies must not keep it
+    return HTMLResponse(reset_password_page().render(token), headers={'Cache-Control': 'no-store'})
 
 
-@router.get('/confirm-email')
+@router.get('/confirm-email', response_model=UserOut)
 async def confirm_email(token: str,
                         user_service: UserService = Depends(get_user_service)):
     try:
         result = await user_service.confirm_email(token)
-        return result
+        return ModelResponse(result)
     except UserNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except AuthorizationException as e:
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
+from starlette import status
+
+router = APIRouter(prefix='/health', tags=['Health'])
+
+
+@router.get('/live')
+async def live():
+    return {'status': 'ok'}
+
+
+@router.get('/ready')
+async def ready(request: Request):
+    if not getattr(request.app.state, 'ready', False):
+        return ORJSONResponse({'status': 'starting'}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {'status': 'ok'}
@@ -1,20 +1,36 @@
-from fastapi import APIRouter
+from functools import cache
 
-from src.core.config import settings
+import orjson
+from fastapi import APIRouter, Request
+from starlette.responses import Response
+
+from src.api.caching import make_etag, etag_matches, not_modified
+from src.core.config import get_settings
 
 router = APIRouter(prefix='/.well-known')
 
 
-@router.get('/jwks.json')
-async def get_jwks():
-    return {
+@cache
+def jwks_document() -> tuple[bytes, str]:
+    """The JWKS body and its ETag, built once since the keys only change with a restart."""
+    body = orjson.dumps({
       "keys": [
         {
           "kty": "RSA",
           "kid": "1",
           "use": "sig",
           "alg": "RS256",
-          "n": settings.JWT_PUBLIC_KEY
+          "n": get_settings().JWT_PUBLIC_KEY
         }
       ]
-    }
\ No newline at end of file
+    })
+    return body, make_etag(body.decode())
+
+
+@router.get('/jwks.json')
+async def get_jwks(request: Request):
+    body, etag = jwks_document()
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={get_settings().JWKS_MAX_AGE}'}
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    return Response(body, media_type='application/json', headers=headers)
@@ -0,0 +1,21 @@
+import asyncio
+
+from fastapi import APIRouter
+from starlette.responses import PlainTextResponse
+
+from src.api.deps import get_multiprocess_metrics
+from src.core.metrics import registry
+
+router = APIRouter(tags=['Metrics'])
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def get_metrics():
+    multiprocess = get_multiprocess_metrics()
+    # with several workers any of them may get the scrape, so it reports the sum of all
+    if multiprocess is None:
+        content = registry.render()
+    else:
+        # reads the files of all workers, kept off the event loop
+        content = await asyncio.to_thread(multiprocess.render)
+    return PlainTextResponse(content, media_type='text/plain; version=0.0.4')
@@ -0,0 +1,26 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+
+from src.api.deps import get_current_admin, get_profile_store
+from src.core.profiling import ProfileStore
+from src.schemas.user import UserOut
+
+router = APIRouter(prefix='/admin/profiles', tags=['Admin'])
+
+
+@router.get('')
+async def list_profiles(admin: UserOut = Depends(get_current_admin),
+                        store: ProfileStore = Depends(get_profile_store)):
+    return await asyncio.to_thread(store.summaries)
+
+
+@router.get('/{profile_id}')
+async def get_profile(profile_id: str,
+                      admin: UserOut = Depends(get_current_admin),
+                      store: ProfileStore = Depends(get_profile_store)):
+    profile = await asyncio.to_thread(store.get, profile_id)
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='No profile with such id')
+    return profile
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 
+from src.api.caching import make_etag, etag_matches, not_modified
 from src.api.deps import get_current_user
+from src.schemas.serialization import ModelResponse
 from src.schemas.user import UserOut
 
 router = APIRouter(prefix='/users', tags=['Users'])
 
 
-@router.get('/me')
-async def get_me(user: UserOut = Depends(get_current_user)):
-    return user
\ No newline at end of file
+@router.get('/me', response_model=UserOut)
+async def get_me(request: Request, user: UserOut = Depends(get_current_user)):
+    # every change to the user row bumps updated_at
+    etag = make_etag(user.id, user.updated_at.isoformat())
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache', 'Vary': 'Authorization'}
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    return ModelResponse(user, headers=headers)
@@ -1,4 +1,5 @@
-from typing import Optional
+from functools import cache
+from typing import Literal, Optional
 
 from pydantic import UUID4
 from pydantic_settings import BaseSettings
@@ -13,6 +14,8 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     DB_DATABASE: str
     DB_DRIVER: str = 'asyncpg'
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
 
     JWT_PRIVATE_KEY_PATH: Path
     JWT_PUBLIC_KEY_PATH: Path
@@ -21,11 +24,80 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_LIFETIME: int = 60 # minutes
     REFRESH_TOKEN_LIFETIME: int = 30 # days
     CONFIRMATION_TOKEN_LIFETIME: int = 1 # day
+    EMAIL_TOKEN_SECRET: Optional[str] = None # derived from the JWT private key if not set
+    EMAIL_TOKEN_STORE: Literal['memory', 'database'] = 'database' # where used email tokens are remembered
+
+    # password hashing
+    PASSWORD_HASH_SCHEME: str = 'bcrypt' # bcrypt | argon2 (requires argon2-cffi)
+    PASSWORD_BCRYPT_ROUNDS: Optional[int] = None # passlib default if not set
+    PASSWORD_ARGON2_TIME_COST: Optional[int] = None
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536 # KiB
+    PASSWORD_ARGON2_PARALLELISM: int = 2
+    PASSWORD_HASH_CALIBRATE: bool = False # pick the cost on startup instead of using the values above, once for all workers with src/serve.py
+    PASSWORD_HASH_TARGET_MS: int = 250 # verification latency the calibration aims for
+
+    # login throttling
+    LOGIN_THROTTLE_BACKEND: Literal['memory', 'database'] = 'database' # memory is per worker process
+    LOGIN_EMAIL_ATTEMPTS: int = 10
+    LOGIN_EMAIL_WINDOW: int = 300 # seconds
+    LOGIN_IP_BURST: int = 30
+    LOGIN_IP_REFILL_RATE: float = 0.5 # attempts per second
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # admission control
+    ADMISSION_HEAVY_CONCURRENCY: int = 8
+    ADMISSION_HEAVY_QUEUE: int = 64
+    ADMISSION_HEAVY_TIMEOUT: float = 2.0 # seconds
+    ADMISSION_DEFAULT_CONCURRENCY: int = 256
+    ADMISSION_DEFAULT_QUEUE: int = 1024
+    ADMISSION_DEFAULT_TIMEOUT: float = 5.0 # seconds
+
+    # request profiling
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0 # fraction of requests profiled at random
+    PROFILING_TOKEN: Optional[str] = None # requests with a matching X-Profile-Token header are always profiled
+    PROFILING_DIR: Path = Path('/tmp/cloudsell-profiles')
+    PROFILING_MAX_PROFILES: int = 100
 
     #rabbit
     RABBITMQ_URL: str
     RABBITMQ_QUEUE: str
 
+    # serving, see src/serve.py
+    WEB_HOST: str = '0.0.0.0'
+    WEB_PORT: int = 8000
+    WEB_WORKERS: Optional[int] = None # one per available CPU if not set
+    DB_CONNECTION_BUDGET: Optional[int] = None # total connections across all workers
+    METRICS_MULTIPROCESS_DIR: Optional[Path] = None # where workers share metrics, set by src/serve.py if unset
+    ACCESS_LOG: bool = False
+    SHUTDOWN_TIMEOUT: int = 30 # seconds to drain in-flight requests
+
+    # logging
+    LOG_LEVEL: str = 'INFO'
+    LOG_JSON: bool = True
+    LOG_QUEUE_SIZE: int = 10000 # records beyond this are dropped instead of blocking
+    LOG_SAMPLING: dict[str, float] = {} # logger name -> fraction of INFO/DEBUG records kept
+
+    # HTTP
+    CORS_ALLOW_ORIGINS: list[str] = [] # exact origins, e.g. ["https://app.example.com"]; any origin is echoed if empty
+    CORS_MAX_AGE: int = 7200 # seconds browsers may reuse a preflight response, Chromium caps it at 7200
+    JWKS_MAX_AGE: int = 3600 # seconds clients may cache the JWKS document
+
+    # authentication audit log
+    AUDIT_ENABLED: bool = True
+    AUDIT_BATCH_SIZE: int = 500 # events per COPY/INSERT
+    AUDIT_FLUSH_INTERVAL: float = 1.0 # seconds before a partial batch is written
+    AUDIT_MAX_BUFFER: int = 50_000 # events beyond this are dropped instead of blocking
+    AUDIT_RETENTION_DAYS: int = 90 # older daily partitions are dropped
+    AUDIT_PARTITIONS_AHEAD: int = 7 # daily partitions created in advance
+
+    # periodic cleanup of expired rows (consumed email tokens, ...)
+    MAINTENANCE_INTERVAL: int = 300 # seconds
+
+    # startup
+    WARMUP_DATABASE: bool = True # open the pool's connections before accepting requests
+    WARMUP_BROKER: bool = True # keep one broker connection open for the app's lifetime
+
     __private_key = None
     __public_key = None
 
@@ -61,7 +133,13 @@ class Templates(BaseSettings):
     class Config:
         env_file = ".env.templates"
 
-settings = Settings()
-email_settings = Templates()
+@cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+@cache
+def get_email_settings() -> Templates:
+    return Templates()
 
 
@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import heapq
+import hmac
+import os
+import struct
+import time
+from abc import ABC, abstractmethod
+from functools import cache
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import get_settings
+from src.core.exceptions import InvalidTokenException
+from src.db.database import get_session_factory
+
+
+class TokenPurpose:
+    CONFIRM_EMAIL = 1
+    RESET_PASSWORD = 2
+
+
+class ConsumedTokenStore(ABC):
+    @abstractmethod
+    async def consume(self, nonce: bytes, expires_at: int) -> bool:
+        """Marks nonce as used. Returns False if it was already consumed."""
+        raise NotImplementedError
+
+
+class InMemoryConsumedTokenStore(ConsumedTokenStore):
+    """Consumed nonces of this process. A nonce stays consumed even if the action it authorised fails."""
+
+    def __init__(self):
+        self._consumed: dict[bytes, int] = {}
+        self._expiry_heap: list[tuple[int, bytes]] = []
+
+    async def consume(self, nonce: bytes, expires_at: int) -> bool:
+        self._prune(int(time.time()))
+        if nonce in self._consumed:
+            return False
+        self._consumed[nonce] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, nonce))
+        return True
+
+    def _prune(self, now: int):
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, nonce = heapq.heappop(heap)
+            self._consumed.pop(nonce, None)
+
+    def __len__(self):
+        return len(self._consumed)
+
+
+class SqlaConsumedTokenStore(ConsumedTokenStore):
+    """Consumed nonces shared by all workers and replicas through the consumed_tokens table.
+
+    The nonce is inserted in the transaction of the given session and is only consumed
+    once the caller commits, together with the change the token authorised. A concurrent
+    consume of the same nonce waits for that transaction and fails if it commits.
+    """
+    _insert = text("""
+        INSERT INTO consumed_tokens (nonce, expires_at) VALUES (:nonce, :expires_at)
+        ON CONFLICT (nonce) DO NOTHING
+        RETURNING nonce
+    """)
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    async def consume(self, nonce: bytes, expires_at: int) -> bool:
+        result = await self._session.execute(self._insert, {'nonce': nonce, 'expires_at': expires_at})
+        return result.first() is not None
+
+
+async def prune_consumed_tokens():
+    """Expired tokens fail verification anyway, their nonces no longer need to be kept."""
+    async with get_session_factory()() as session:
+        await session.execute(text("DELETE FROM consumed_tokens WHERE expires_at <= :now"),
+                              {'now': int(time.time())})
+        await session.commit()
+
+
+class EmailTokenProvider:
+    """Compact HMAC-SHA256 signed single-use tokens for email links.
+
+    Layout (before base64url): user id (16 bytes) | purpose (1) | exp (4) | nonce (8) | mac (32).
+    """
+    _body = struct.Struct('>16sBI8s')
+    _mac_size = hashlib.sha256().digest_size
+
+    def __init__(self, secret: bytes):
+        self._secret = secret
+
+    def encode(self, user_id: UUID | str, purpose: int, expires_delta: int) -> str:
+        if not isinstance(user_id, UUID):
+            user_id = UUID(str(user_id))
+        expires_at = int(time.time()) + expires_delta
+        body = self._body.pack(user_id.bytes, purpose, expires_at, os.urandom(8))
+        mac = hmac.new(self._secret, body, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(body + mac).rstrip(b'=').decode()
+
+    def decode(self, token: str, purpose: int) -> UUID:
+        return self._verify(token, purpose)[0]
+
+    async def consume(self, token: str, purpose: int, store: ConsumedTokenStore) -> UUID:
+        user_id, nonce, expires_at = self._verify(token, purpose)
+        if not await store.consume(nonce, expires_at):
+            raise InvalidTokenException('Token has already been used')
+        return user_id
+
+    def _verify(self, token: str, purpose: int) -> tuple[UUID, bytes, int]:
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        except (ValueError, TypeError):
+            raise InvalidTokenException('Token is invalid or expired')
+        if len(raw) != self._body.size + self._mac_size:
+            raise InvalidTokenException('Token is invalid or expired')
+        body, mac = raw[:self._body.size], raw[self._body.size:]
+        expected = hmac.new(self._secret, body, hashlib.sha256).digest()
+        if not hmac.compare_digest(mac, expected):
+            raise InvalidTokenException('Token is invalid or expired')
+        user_id, token_purpose, expires_at, nonce = self._body.unpack(body)
+        if token_purpose != purpose or expires_at <= time.time():
+            raise InvalidTokenException('Token is invalid or expired')
+        return UUID(bytes=user_id), nonce, expires_at
+
+
+def _derive_secret() -> bytes:
+    settings = get_settings()
+    if settings.EMAIL_TOKEN_SECRET:
+        return settings.EMAIL_TOKEN_SECRET.encode()
+    return hashlib.sha256(b'cloudsell-email-token:' + settings.JWT_PRIVATE_KEY.encode()).digest()
+
+
+@cache
+def get_email_token_provider() -> EmailTokenProvider:
+    return EmailTokenProvider(_derive_secret())
@@ -1,46 +1,86 @@
-from src.core.config import settings
+from src.core.config import get_settings
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
+from jose import jwt, jwk, JWTError
+from jose.backends.base import Key
 from src.core.exceptions import InvalidTokenException
+from src.core.metrics import registry, timed
+
+
+def _jwt_timer(operation: str):
+    return timed(registry.histogram('jwt_seconds', 'Time spent signing and verifying JWTs', operation=operation))
 
 
 class JWTProvider:
     token_type = 'Bearer'
-    @staticmethod
-    def encode_refresh_token(payload: dict,
-                             expires_delta=settings.REFRESH_TOKEN_LIFETIME,
-                             algorithm=settings.JWT_ALGORITHM,
-                             key=settings.JWT_PRIVATE_KEY):
+    # parsed once, loading a PEM private key costs tens of milliseconds
+    _private_key: Key | None = None
+    _public_key: Key | None = None
+
+    @classmethod
+    def load_keys(cls):
+        settings = get_settings()
+        cls._private_key = jwk.construct(settings.JWT_PRIVATE_KEY, settings.JWT_ALGORITHM)
+        cls._public_key = jwk.construct(settings.JWT_PUBLIC_KEY, settings.JWT_ALGORITHM)
+
+    @classmethod
+    def private_key(cls) -> Key:
+        if cls._private_key is None:
+            cls.load_keys()
+        return cls._private_key
+
+    @classmethod
+    def public_key(cls) -> Key:
+        if cls._public_key is None:
+            cls.load_keys()
+        return cls._public_key
+
+    @classmethod
+    @_jwt_timer('encode_refresh')
+    def encode_refresh_token(cls,
+                             payload: dict,
+                             expires_delta=None,
+                             algorithm=None,
+                             key=None):
+        settings = get_settings()
+        if expires_delta is None:
+            expires_delta = settings.REFRESH_TOKEN_LIFETIME
         to_encode = payload.copy()
         if expires_delta:
             expire = datetime.utcnow() + timedelta(days=expires_delta)
         else:
             expire = datetime.utcnow() + timedelta(days=1)
         to_encode.update({'exp': expire})
-        encoded_jwt = jwt.encode(to_encode, key, algorithm=algorithm)
+        encoded_jwt = jwt.encode(to_encode, key or cls.private_key(), algorithm=algorithm or settings.JWT_ALGORITHM)
         return encoded_jwt
 
-    @staticmethod
-    def encode_access_token(payload: dict,
-                            expires_delta=settings.ACCESS_TOKEN_LIFETIME,
-                            algorithm=settings.JWT_ALGORITHM,
-                            key=settings.JWT_PRIVATE_KEY):
+    @classmethod
+    @_jwt_timer('encode_access')
+    def encode_access_token(cls,
+                            payload: dict,
+                            expires_delta=None,
+                            algorithm=None,
+                            key=None):
+        settings = get_settings()
+        if expires_delta is None:
+            expires_delta = settings.ACCESS_TOKEN_LIFETIME
         to_encode = payload.copy()
         if expires_delta:
             expire = datetime.utcnow() + timedelta(minutes=expires_delta)
         else:
             expire = datetime.utcnow() + timedelta(minutes=15)
         to_encode.update({'exp': expire})
-        encoded_jwt = jwt.encode(to_encode, key, algorithm=algorithm)
+        encoded_jwt = jwt.encode(to_encode, key or cls.private_key(), algorithm=algorithm or settings.JWT_ALGORITHM)
         return encoded_jwt
 
-    @staticmethod
-    def decode(token,
-               public_key=settings.JWT_PUBLIC_KEY,
-               algorithm=settings.JWT_ALGORITHM) -> dict:
+    @classmethod
+    @_jwt_timer('decode')
+    def decode(cls,
+               token,
+               public_key=None,
+               algorithm=None) -> dict:
         try:
-            payload = jwt.decode(token, public_key, algorithms=[algorithm])
+            payload = jwt.decode(token, public_key or cls.public_key(),
+                                 algorithms=[algorithm or get_settings().JWT_ALGORITHM])
             return payload
         except JWTError as e:
             raise InvalidTokenException('Token is invalid or expired')
-
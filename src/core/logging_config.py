@@ -0,0 +1,133 @@
+"""Structured JSON logging that keeps formatting and I/O off the event loop.
+
+Records are redacted and put on a bounded queue by the calling thread; a
+background QueueListener formats and writes them. When the queue is full,
+records are dropped and counted instead of blocking the caller.
+"""
+import logging
+import queue
+import random
+import re
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+from src.core.metrics import registry
+
+REDACTED = '[REDACTED]'
+SENSITIVE_KEYS = frozenset({'token', 'access_token', 'refresh_token', 'password', 'authorization'})
+# query parameters with sensitive values in logged URLs, e.g. /auth/confirm-email?token=...
+_SENSITIVE_QUERY = re.compile(rf'([?&](?:{"|".join(SENSITIVE_KEYS)})=)[^&#\s]*')
+# attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+dropped_records = registry.counter('log_records_dropped', 'Log records dropped because the log queue was full')
+
+
+def redact(value):
+    if isinstance(value, str):
+        return _SENSITIVE_QUERY.sub(rf'\1{REDACTED}', value) if '=' in value else value
+    if isinstance(value, dict):
+        return {key: REDACTED if key in SENSITIVE_KEYS else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item) for item in value)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of INFO and lower records for the configured loggers (and their children)."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self._rates = rates
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix, value in self._rates.items():
+                if name == prefix or name.startswith(prefix + '.'):
+                    rate = value
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # formatting is left to the listener thread, only sensitive values are scrubbed here
+        if isinstance(record.msg, str) and '=' in record.msg:
+            # a URL with a sensitive parameter may be split between msg and args, e.g.
+            # '?token=%s', so it is redacted after formatting
+            record.msg = redact(record.getMessage())
+            record.args = None
+        elif isinstance(record.args, (dict, tuple)):
+            record.args = redact(record.args)
+        for key in record.__dict__.keys() - _RECORD_ATTRIBUTES:
+            value = getattr(record, key)
+            setattr(record, key, REDACTED if key in SENSITIVE_KEYS else redact(value))
+        if record.exc_info and not record.exc_text:
+            # tracebacks reference frames that may change before the listener gets to them
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def __init__(self, max_size: int):
+        # SimpleQueue is much cheaper to put to than queue.Queue, the bound is checked by hand
+        super().__init__(queue.SimpleQueue())
+        self.max_size = max_size
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= self.max_size:
+            dropped_records.inc()
+            return
+        self.queue.put_nowait(record)
+
+
+def configure_logging(level: str = 'INFO', json: bool = True, queue_size: int = 10000,
+                      sampling: dict[str, float] | None = None) -> QueueListener:
+    """Routes all loggers through a queue to stdout. The returned listener is already started."""
+    output = logging.StreamHandler(sys.stdout)
+    if json:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    handler = NonBlockingQueueHandler(queue_size)
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTasks:
+    """Runs cleanup jobs one after another every interval seconds in a single background task.
+
+    A failing job is logged and tried again on the next round.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._jobs: dict[str, Callable[[], Awaitable]] = {}
+        self._task: asyncio.Task | None = None
+
+    def add(self, name: str, job: Callable[[], Awaitable]):
+        self._jobs[name] = job
+
+    def start(self):
+        if self._jobs:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for name, job in self._jobs.items():
+                try:
+                    await job()
+                except Exception:
+                    logger.warning(f'Maintenance job {name} failed', exc_info=True)
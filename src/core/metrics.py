@@ -0,0 +1,229 @@
+"""Minimal Prometheus-compatible metrics.
+
+Updates are plain attribute/list increments with no locking: the app runs its
+hot paths on a single event loop thread, and the occasional lost increment from
+a worker thread is acceptable for monitoring data.
+"""
+import functools
+import inspect
+import json
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable
+
+from src.core.profiling import record_span
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+
+class Counter:
+    """Incremented with inc(), or read from a callback at scrape time for totals kept elsewhere."""
+
+    def __init__(self, name: str, description: str, labels: dict | None = None,
+                 callback: Callable[[], float] | None = None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.value = 0
+        self.callback = callback
+
+    def inc(self, amount: int | float = 1):
+        self.value += amount
+
+    def samples(self):
+        yield f'{self.name}_total', self.labels, self.callback() if self.callback is not None else self.value
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, labels: dict | None = None,
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            yield f'{self.name}_bucket', {**self.labels, 'le': repr(bound)}, cumulative
+        cumulative += self._counts[-1]
+        yield f'{self.name}_bucket', {**self.labels, 'le': '+Inf'}, cumulative
+        yield f'{self.name}_sum', self.labels, self.sum
+        yield f'{self.name}_count', self.labels, cumulative
+
+
+class Gauge:
+    """Value read from a callback at scrape time, so it costs nothing between scrapes."""
+
+    def __init__(self, name: str, description: str, labels: dict | None = None,
+                 callback: Callable[[], float] | None = None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.callback = callback
+
+    def samples(self):
+        if self.callback is not None:
+            yield self.name, self.labels, self.callback()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[tuple, Counter | Histogram | Gauge] = {}
+
+    def counter(self, name: str, description: str, callback: Callable[[], float] | None = None,
+                **labels) -> Counter:
+        counter = self._get_or_create(Counter, name, description, labels)
+        if callback is not None:
+            counter.callback = callback
+        return counter
+
+    def histogram(self, name: str, description: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+                  **labels) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labels, buckets=buckets)
+
+    def gauge(self, name: str, description: str, callback: Callable[[], float], **labels) -> Gauge:
+        gauge = self._get_or_create(Gauge, name, description, labels)
+        gauge.callback = callback
+        return gauge
+
+    def _get_or_create(self, _class, name, description, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            metric = self._metrics[key] = _class(name, description, labels, **kwargs)
+        return metric
+
+    def collect(self) -> list[dict]:
+        """Current samples grouped by metric name, in a JSON serializable form."""
+        families: dict[str, dict] = {}
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            family = families.get(metric.name)
+            if family is None:
+                family = families[metric.name] = {'name': metric.name, 'kind': type(metric).__name__.lower(),
+                                                  'description': metric.description, 'samples': []}
+            family['samples'].extend([name, labels, value] for name, labels, value in metric.samples())
+        return list(families.values())
+
+    def render(self) -> str:
+        return render_families(self.collect())
+
+
+def render_families(families: list[dict]) -> str:
+    lines = []
+    for family in families:
+        lines.append(f'# HELP {family["name"]} {family["description"]}')
+        lines.append(f'# TYPE {family["name"]} {family["kind"]}')
+        for name, labels, value in family['samples']:
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class MultiprocessMetrics:
+    """Sums the registries of all worker processes of one server.
+
+    Every worker writes its samples to <pid>.json in a shared directory (periodically and
+    before each scrape it serves), so a scrape answered by any worker covers all of them.
+    Counters and histograms of workers that have exited are kept so totals never go
+    backwards; their gauges are dropped.
+    """
+
+    def __init__(self, registry: Registry, directory: Path, interval: float = 5.0):
+        self.registry = registry
+        self.directory = Path(directory)
+        self.interval = interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self):
+        path = self.directory / f'{os.getpid()}.json'
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.registry.collect(), f)
+        os.replace(tmp_path, path)
+
+    def render(self) -> str:
+        self.write()
+        merged: dict[str, tuple[dict, dict]] = {}
+        for path in sorted(self.directory.glob('*.json')):
+            try:
+                with open(path) as f:
+                    worker_families = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _process_alive(int(path.stem))
+            for family in worker_families:
+                if family['kind'] == 'gauge' and not alive:
+                    continue
+                _, totals = merged.setdefault(family['name'], (family, {}))
+                for name, labels, value in family['samples']:
+                    key = (name, tuple(labels.items()))
+                    totals[key] = totals.get(key, 0) + value
+        return render_families([
+            {**family, 'samples': [[name, dict(labels), value] for (name, labels), value in totals.items()]}
+            for family, totals in sorted(merged.values(), key=lambda item: item[0]['name'])
+        ])
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def timed(histogram: Histogram):
+    """Observes the wall time of every call of a sync or async function.
+
+    Calls made while the request is being profiled are also recorded as spans.
+    """
+    span_name = '.'.join([histogram.name.removesuffix('_seconds'), *map(str, histogram.labels.values())])
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    histogram.observe(elapsed)
+                    record_span(span_name, started, elapsed)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                histogram.observe(elapsed)
+                record_span(span_name, started, elapsed)
+        return wrapper
+    return decorator
@@ -0,0 +1,123 @@
+import cProfile
+import fcntl
+import io
+import json
+import os
+import pstats
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+# spans of the request being profiled; None for all other requests
+current_spans: ContextVar[list | None] = ContextVar('current_spans', default=None)
+
+
+def record_span(name: str, started: float, duration: float):
+    spans = current_spans.get()
+    if spans is not None:
+        spans.append({'name': name, 'start': started, 'duration': duration})
+
+
+class RequestProfile:
+    def __init__(self, profile_id: str, method: str, path: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.status = None
+        self.spans = []
+        self._profiler = cProfile.Profile()
+        self._token = None
+        self._started = 0.0
+        self._wall_started = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        self._token = current_spans.set(self.spans)
+        self._wall_started = time.time()
+        self._started = time.perf_counter()
+        self._profiler.enable()
+
+    def stop(self):
+        self._profiler.disable()
+        self.duration = time.perf_counter() - self._started
+        current_spans.reset(self._token)
+
+    def to_dict(self, top: int = 50) -> dict:
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        for span in self.spans:
+            span['start'] -= self._started
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'timestamp': self._wall_started,
+            'duration': self.duration,
+            'spans': self.spans,
+            'profile': stream.getvalue(),
+        }
+
+
+class ProfileStore:
+    """Fixed number of profile files on disk, the oldest slot is overwritten first.
+
+    The slot is picked from the files on disk under an exclusive lock, so the workers
+    of one server can share the directory without overwriting each other's profiles.
+    """
+
+    def __init__(self, directory: Path, capacity: int):
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.directory / '.lock'
+
+    def save(self, profile: dict):
+        with open(self._lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            path = self.directory / f'{self._free_slot():04d}.json'
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(profile, f)
+            os.replace(tmp_path, path)
+
+    def _free_slot(self) -> int:
+        slots = self._slots()
+        if len(slots) < self.capacity:
+            used = {self._slot_number(path) for path in slots}
+            return next(slot for slot in range(self.capacity) if slot not in used)
+        return self._slot_number(slots[0])
+
+    def summaries(self) -> list[dict]:
+        summaries = []
+        for path in reversed(self._slots()):
+            profile = self._read(path)
+            if profile:
+                profile.pop('profile', None)
+                profile.pop('spans', None)
+                summaries.append(profile)
+        return summaries
+
+    def get(self, profile_id: str) -> dict | None:
+        for path in self._slots():
+            profile = self._read(path)
+            if profile and profile['id'] == profile_id:
+                return profile
+        return None
+
+    def _slots(self) -> list[Path]:
+        """Slot files ordered from oldest to newest."""
+        return sorted(self.directory.glob('[0-9][0-9][0-9][0-9].json'), key=lambda p: p.stat().st_mtime)
+
+    @staticmethod
+    def _slot_number(path: Path) -> int:
+        return int(path.stem)
+
+    @staticmethod
+    def _read(path: Path) -> dict | None:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,154 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+
+class RateLimiter(ABC):
+    def __init__(self):
+        self.allowed = 0
+        self.throttled = 0
+
+    @abstractmethod
+    async def hit(self, key: str) -> float:
+        """Registers an attempt for key. Returns 0 if allowed, otherwise seconds until retry."""
+        raise NotImplementedError
+
+    async def prune(self):
+        """Drops state that can no longer affect a decision. In-memory limiters are bounded by LRU eviction."""
+
+    def _record(self, retry_after: float) -> float:
+        if retry_after:
+            self.throttled += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    def stats(self) -> dict:
+        return {'allowed': self.allowed, 'throttled': self.throttled}
+
+
+class _LRUState:
+    """Bounded per-key state; the least recently used keys are evicted first."""
+
+    def __init__(self, max_keys: int):
+        self._max_keys = max_keys
+        self._items: OrderedDict[str, list] = OrderedDict()
+        self.evicted = 0
+
+    def get(self, key: str, default: list) -> list:
+        items = self._items
+        value = items.get(key)
+        if value is None:
+            value = items[key] = default
+            if len(items) > self._max_keys:
+                items.popitem(last=False)
+                self.evicted += 1
+        else:
+            items.move_to_end(key)
+        return value
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SlidingWindowLimiter(RateLimiter):
+    """Sliding window counter: the previous window's count is weighted by its remaining overlap."""
+
+    def __init__(self, limit: int, window: int, max_keys: int = 100_000):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._state = _LRUState(max_keys)
+
+    async def hit(self, key: str) -> float:
+        now = time.monotonic()
+        window_start = now - now % self.window
+        # [window_start, count, previous_count]
+        state = self._state.get(key, [window_start, 0, 0])
+        if state[0] != window_start:
+            state[2] = state[1] if state[0] == window_start - self.window else 0
+            state[0], state[1] = window_start, 0
+        state[1] += 1
+        return self._record(_sliding_retry_after(now, window_start, self.window, self.limit, state[1], state[2]))
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'keys': len(self._state), 'evicted': self._state.evicted}
+
+
+class TokenBucketLimiter(RateLimiter):
+    def __init__(self, capacity: int, refill_rate: float, max_keys: int = 100_000):
+        super().__init__()
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._state = _LRUState(max_keys)
+
+    async def hit(self, key: str) -> float:
+        now = time.monotonic()
+        # [tokens, last_refill]
+        state = self._state.get(key, [float(self.capacity), now])
+        tokens = min(self.capacity, state[0] + (now - state[1]) * self.refill_rate)
+        state[1] = now
+        if tokens >= 1:
+            state[0] = tokens - 1
+            return self._record(0)
+        state[0] = tokens
+        return self._record((1 - tokens) / self.refill_rate)
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'keys': len(self._state), 'evicted': self._state.evicted}
+
+
+class SqlaSlidingWindowLimiter(RateLimiter):
+    """Sliding window counter shared between replicas through the rate_limits table."""
+    _upsert = text("""
+        INSERT INTO rate_limits (key, window_start, count, previous_count)
+        VALUES (:key, :window_start, 1, 0)
+        ON CONFLICT (key) DO UPDATE SET
+            previous_count = CASE
+                WHEN rate_limits.window_start = :window_start THEN rate_limits.previous_count
+                WHEN rate_limits.window_start = :window_start - :window THEN rate_limits.count
+                ELSE 0 END,
+            count = CASE WHEN rate_limits.window_start = :window_start THEN rate_limits.count + 1 ELSE 1 END,
+            window_start = :window_start
+        RETURNING count, previous_count
+    """)
+    # limiters with different windows share the table, each one only prunes its own keys
+    _prune = text("DELETE FROM rate_limits WHERE starts_with(key, :prefix) AND window_start < :threshold")
+
+    def __init__(self, session_factory: async_sessionmaker, limit: int, window: int, prefix: str = ''):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.prefix = prefix
+        self._session_factory = session_factory
+
+    async def hit(self, key: str) -> float:
+        now = time.time()
+        window_start = int(now - now % self.window)
+        async with self._session_factory() as session:
+            result = await session.execute(self._upsert, {'key': self.prefix + key,
+                                                          'window_start': window_start,
+                                                          'window': self.window})
+            count, previous_count = result.one()
+            await session.commit()
+        return self._record(_sliding_retry_after(now, window_start, self.window, self.limit, count, previous_count))
+
+    async def prune(self):
+        async with self._session_factory() as session:
+            await session.execute(self._prune, {'prefix': self.prefix,
+                                                'threshold': int(time.time()) - 2 * self.window})
+            await session.commit()
+
+
+def _sliding_retry_after(now: float, window_start: float, window: int, limit: int,
+                         count: int, previous_count: int) -> float:
+    elapsed = now - window_start
+    if previous_count * (1 - elapsed / window) + count <= limit:
+        return 0
+    if count > limit:
+        return window - elapsed
+    # the weighted previous window has to decay below the remaining budget
+    return max((1 - (limit - count) / previous_count) * window - elapsed, 1)
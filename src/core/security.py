@@ -1,11 +1,91 @@
+import time
+
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+from src.core.config import get_settings
+from src.core.metrics import registry, timed
+
+MIN_BCRYPT_ROUNDS = 10
+
+verify_time = registry.histogram('password_verify_seconds', 'Time spent verifying password hashes')
+hash_time = registry.histogram('password_hash_seconds', 'Time spent hashing passwords')
+rehash_count = registry.counter('password_rehash', 'Password hashes upgraded to the current parameters on login')
+
+
+def context_options(scheme: str, **params) -> dict:
+    """CryptContext options for scheme; hashes of other schemes or lower cost are marked for rehash."""
+    if scheme == 'argon2':
+        options = {'schemes': ['argon2', 'bcrypt'], 'deprecated': 'auto'}
+        options.update({f'argon2__{name}': value for name, value in params.items() if value})
+        return options
+    if scheme != 'bcrypt':
+        raise ValueError(f'Unsupported password hash scheme: {scheme}')
+    rounds = params.get('rounds') or bcrypt.default_rounds
+    return {'schemes': ['bcrypt'], 'deprecated': 'auto',
+            'bcrypt__default_rounds': rounds, 'bcrypt__min_rounds': rounds}
+
+
+def configured_params(scheme: str) -> dict:
+    settings = get_settings()
+    if scheme == 'argon2':
+        return {
+            'time_cost': settings.PASSWORD_ARGON2_TIME_COST,
+            'memory_cost': settings.PASSWORD_ARGON2_MEMORY_COST,
+            'parallelism': settings.PASSWORD_ARGON2_PARALLELISM,
+        }
+    return {'rounds': settings.PASSWORD_BCRYPT_ROUNDS}
+
+
+# reconfigured from settings on startup, see configure_password_hashing
+pwd_context = CryptContext(**context_options('bcrypt'))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+def configure_password_hashing(scheme: str, **params):
+    pwd_context.load(context_options(scheme, **params))
 
+
+def calibrate(scheme: str, target: float, **params) -> dict:
+    """Picks the highest cost whose verification still fits into target seconds on this machine."""
+    if scheme == 'argon2':
+        cost_name, cost = 'time_cost', 1
+    else:
+        cost_name, cost = 'rounds', MIN_BCRYPT_ROUNDS
+    best = {**params, cost_name: cost}
+    while True:
+        candidate = {**params, cost_name: cost}
+        context = CryptContext(**context_options(scheme, **candidate))
+        hashed = context.hash('calibration-password')
+        started = time.perf_counter()
+        context.verify('calibration-password', hashed)
+        if time.perf_counter() - started > target:
+            return best
+        best = candidate
+        cost += 1
+
+
+@timed(hash_time)
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+@timed(verify_time)
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verifies the password and returns a new hash if the stored one uses outdated parameters."""
+    valid, new_hash = _verify_and_update(plain_password, hashed_password)
+    if new_hash:
+        rehash_count.inc()
+    return valid, new_hash
+
+
+@timed(verify_time)
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def dummy_verify() -> None:
+    pwd_context.dummy_verify()
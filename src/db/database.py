@@ -1,11 +1,37 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from functools import cache
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import declarative_base
 
-from src.core.config import settings
+from src.core.config import get_settings
+from src.core.metrics import registry
+
+Base = declarative_base()
+
+
+@cache
+def get_engine() -> AsyncEngine:
+    settings = get_settings()
+    engine = create_async_engine(url=settings.DB_URL,
+                                 pool_size=settings.DB_POOL_SIZE,
+                                 max_overflow=settings.DB_MAX_OVERFLOW)
+    pool = engine.sync_engine.pool
+    registry.gauge('db_pool_size', 'Configured size of the connection pool', lambda: pool.size())
+    registry.gauge('db_pool_checked_out', 'Connections currently in use', lambda: pool.checkedout())
+    registry.gauge('db_pool_checked_in', 'Idle connections in the pool', lambda: pool.checkedin())
+    registry.gauge('db_pool_overflow', 'Connections opened above the pool size', lambda: max(pool.overflow(), 0))
+    return engine
+
+
+@cache
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=get_engine(),
+                              expire_on_commit=False,
+                              class_=AsyncSession)
+
 
-engine = create_async_engine(
-    url=settings.DB_URL)
-AsyncSessionFactory = async_sessionmaker(bind=engine,
-                                         expire_on_commit=False,
-                                         class_=AsyncSession)
-Base = declarative_base()
\ No newline at end of file
+async def dispose_engine():
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+    get_session_factory.cache_clear()
+    get_engine.cache_clear()
@@ -0,0 +1,7 @@
+from src.exceptions.base import CloudsellIDException
+
+
+class TooManyAttempts(CloudsellIDException):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -1,27 +1,182 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
 from starlette.middleware.cors import CORSMiddleware
 
-from src.api.v1.auth import router as auth_router
+from src.api.deps import (get_producer_factory, build_profile_store, get_login_throttle, get_audit_log,
+                          get_multiprocess_metrics)
+from src.api.middlewares.admission import AdmissionControlMiddleware, AdmissionPolicy, AdmissionRule
+from src.api.middlewares.metrics import RequestMetricsMiddleware
+from src.api.middlewares.profiling import ProfilingMiddleware
+from src.api.v1.auth import router as auth_router, reset_password_page
 from src.api.v1.users import router as users_router
-from src.api.v1.jwt_conf import router as jwt_router
-from src.core.config import settings
-
-app = FastAPI(
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json",
-    root_path="/",
-    title=settings.APP_NAME
-)
-app.include_router(auth_router)
-app.include_router(users_router)
-app.include_router(jwt_router)
-
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origin_regex="https?://.*",
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
\ No newline at end of file
+from src.api.v1.jwt_conf import router as jwt_router, jwks_document
+from src.api.v1.metrics import router as metrics_router
+from src.api.v1.profiles import router as profiles_router
+from src.api.v1.health import router as health_router
+from src.core.config import get_settings, Settings
+from src.core.email_token import get_email_token_provider, prune_consumed_tokens
+from src.core.jwt_provider import JWTProvider
+from src.core.logging_config import configure_logging
+from src.core.maintenance import PeriodicTasks
+from src.core.security import calibrate, configure_password_hashing, configured_params
+from src.db.database import get_engine, dispose_engine
+
+logger = logging.getLogger(__name__)
+
+BROKER_WARMUP_TIMEOUT = 10 # seconds
+
+
+async def configure_password_hashing_from_settings(settings: Settings):
+    scheme = settings.PASSWORD_HASH_SCHEME
+    params = configured_params(scheme)
+    if settings.PASSWORD_HASH_CALIBRATE:
+        params = await asyncio.to_thread(calibrate, scheme, settings.PASSWORD_HASH_TARGET_MS / 1000, **params)
+        logger.info(f'Calibrated {scheme} password hashing: {params}')
+    configure_password_hashing(scheme, **params)
+
+
+async def warm_up_database(settings: Settings):
+    engine = get_engine()
+
+    async def open_connection():
+        async with engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+
+    # connections are opened concurrently so each one is a separate pool entry
+    await asyncio.gather(*(open_connection() for _ in range(settings.DB_POOL_SIZE)))
+
+
+async def warm_up_broker():
+    # email is best-effort, an unreachable broker must not keep the app from starting
+    try:
+        await asyncio.wait_for(get_producer_factory().start(), BROKER_WARMUP_TIMEOUT)
+    except Exception:
+        logger.warning('Could not open the shared broker connection, publishing will connect per message',
+                       exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    log_listener = configure_logging(settings.LOG_LEVEL, settings.LOG_JSON,
+                                     settings.LOG_QUEUE_SIZE, settings.LOG_SAMPLING)
+    app.state.ready = False
+    # created as startup goes, shutdown only stops what exists
+    audit_log = None
+    maintenance = None
+    metrics_sync = None
+    multiprocess_metrics = None
+    try:
+        await asyncio.to_thread(JWTProvider.load_keys)
+        get_email_token_provider()
+        login_throttle = get_login_throttle()
+        reset_password_page()
+        jwks_document()
+        await configure_password_hashing_from_settings(settings)
+        if settings.WARMUP_DATABASE:
+            await warm_up_database(settings)
+        if settings.WARMUP_BROKER:
+            await warm_up_broker()
+        audit_log = get_audit_log()
+        if audit_log is not None:
+            await audit_log.maintain()
+            audit_log.start()
+        maintenance = PeriodicTasks(settings.MAINTENANCE_INTERVAL)
+        if settings.EMAIL_TOKEN_STORE == 'database':
+            maintenance.add('consumed_tokens', prune_consumed_tokens)
+        maintenance.add('login_throttle', login_throttle.prune)
+        maintenance.start()
+        multiprocess_metrics = get_multiprocess_metrics()
+        if multiprocess_metrics is not None:
+            await asyncio.to_thread(multiprocess_metrics.write)
+            metrics_sync = PeriodicTasks(multiprocess_metrics.interval)
+            metrics_sync.add('metrics', lambda: asyncio.to_thread(multiprocess_metrics.write))
+            metrics_sync.start()
+        app.state.ready = True
+        logger.info('Startup complete')
+        yield
+    except Exception:
+        if not app.state.ready:
+            # logged here, uvicorn reports it only after the log listener has stopped
+            logger.exception('Startup failed')
+        raise
+    finally:
+        # the server has stopped accepting and drained in-flight requests by now
+        app.state.ready = False
+        if maintenance is not None:
+            await maintenance.close()
+        if metrics_sync is not None:
+            await metrics_sync.close()
+        if audit_log is not None:
+            await audit_log.close()
+        await get_producer_factory().close()
+        await dispose_engine()
+        if multiprocess_metrics is not None:
+            # the last totals of this worker stay part of the sum after it exits
+            await asyncio.to_thread(multiprocess_metrics.write)
+        logger.info('Shutdown complete')
+        log_listener.stop()
+
+
+def create_app() -> FastAPI:
+    settings = get_settings()
+    app = FastAPI(
+        docs_url="/docs",
+        redoc_url="/redoc",
+        openapi_url="/openapi.json",
+        root_path="/",
+        title=settings.APP_NAME,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
+    app.state.ready = False
+    app.include_router(auth_router)
+    app.include_router(users_router)
+    app.include_router(jwt_router)
+    app.include_router(metrics_router)
+    app.include_router(profiles_router)
+    app.include_router(health_router)
+
+    auth_heavy = AdmissionPolicy('auth_heavy',
+                                 max_concurrency=settings.ADMISSION_HEAVY_CONCURRENCY,
+                                 max_queue=settings.ADMISSION_HEAVY_QUEUE,
+                                 queue_timeout=settings.ADMISSION_HEAVY_TIMEOUT)
+    default = AdmissionPolicy('default',
+                              max_concurrency=settings.ADMISSION_DEFAULT_CONCURRENCY,
+                              max_queue=settings.ADMISSION_DEFAULT_QUEUE,
+                              queue_timeout=settings.ADMISSION_DEFAULT_TIMEOUT)
+
+    profile_store = build_profile_store()
+    if profile_store is not None:
+        app.add_middleware(ProfilingMiddleware,
+                           store=profile_store,
+                           sample_rate=settings.PROFILING_SAMPLE_RATE,
+                           token=settings.PROFILING_TOKEN)
+    # inside admission control: latency excludes queue wait, shed requests are counted there
+    app.add_middleware(RequestMetricsMiddleware)
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        rules=[
+            AdmissionRule(auth_heavy, auth_router, paths=('/register', '/login', '/reset-password')),
+            AdmissionRule(default, auth_router),
+            AdmissionRule(default, users_router),
+        ],
+    )
+    # a literal "*" can't be combined with credentials, browsers reject it; echo the origin instead
+    allowed_origins = frozenset(settings.CORS_ALLOW_ORIGINS) - {'*'}
+    app.add_middleware(
+        CORSMiddleware,
+        # a set, so checking the Origin header is a hash lookup
+        allow_origins=allowed_origins,
+        allow_origin_regex=None if allowed_origins else "https?://.*",
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        max_age=settings.CORS_MAX_AGE,
+    )
+    return app
@@ -1 +1,4 @@
-from src.models.user import *
\ No newline at end of file
+from src.models.user import *
+from src.models.rate_limit import *
+from src.models.audit import *
+from src.models.consumed_token import *
@@ -0,0 +1,22 @@
+from sqlalchemy import Table, Column, UUID, String, VARCHAR, DateTime, Boolean, Index, func
+
+from src.db.database import Base
+
+# Range partitioned by day on occurred_at, partitions are named auth_events_pYYYYMMDD and
+# are created and dropped by SqlaAuditRepository. Append-only, so there is no primary key.
+auth_events = Table(
+    'auth_events',
+    Base.metadata,
+    Column('occurred_at', DateTime, nullable=False),
+    Column('event', String(32), nullable=False),
+    Column('success', Boolean, nullable=False),
+    Column('user_id', UUID(as_uuid=True)),
+    Column('email', VARCHAR(70)),
+    Column('client_ip', String(45)),
+    Column('detail', String(64)),
+    postgresql_partition_by='RANGE (occurred_at)',
+)
+Index('ix_auth_events_user_id_occurred_at', auth_events.c.user_id, auth_events.c.occurred_at)
+Index('ix_auth_events_email_occurred_at', func.lower(auth_events.c.email), auth_events.c.occurred_at)
+
+AUTH_EVENT_COLUMNS = tuple(column.name for column in auth_events.columns)
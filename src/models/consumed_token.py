@@ -0,0 +1,10 @@
+from sqlalchemy import Column, LargeBinary, BigInteger
+
+from src.db.database import Base
+
+
+class ConsumedToken(Base):
+    __tablename__ = 'consumed_tokens'
+
+    nonce = Column(LargeBinary, primary_key=True)
+    expires_at = Column(BigInteger, nullable=False, index=True)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger, Integer
+
+from src.db.database import Base
+
+
+class RateLimit(Base):
+    __tablename__ = 'rate_limits'
+
+    key = Column(String(320), primary_key=True)
+    window_start = Column(BigInteger, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    previous_count = Column(Integer, nullable=False, default=0)
@@ -2,7 +2,7 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, UUID, String, VARCHAR, DateTime, Boolean, Enum
+from sqlalchemy import Column, UUID, String, VARCHAR, DateTime, Boolean, Enum, Index, func
 
 from src.db.database import Base
 
@@ -15,12 +15,18 @@ class AccountType(enum.Enum):
 class User(Base):
     __tablename__ = 'users'
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, nullable=False)
     name = Column(String, nullable=False)
     password = Column(String, nullable=False)
-    email = Column(VARCHAR(70), unique=True, nullable=False)
+    email = Column(VARCHAR(70), nullable=False)
     email_confirmed = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     account_type = Column(Enum(AccountType), default=AccountType.PHYSICAL, nullable=False)
     is_admin = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        # lookups go through lower(email), see SqlaUserRepository.get_by_email
+        Index('ix_users_email_lower', func.lower(email), unique=True),
+        Index('ix_users_unconfirmed_created_at', created_at, postgresql_where=email_confirmed.is_(False)),
+    )
@@ -0,0 +1,88 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.metrics import registry, timed
+from src.models.audit import auth_events, AUTH_EVENT_COLUMNS
+
+PARTITION_PREFIX = f'{auth_events.name}_p'
+
+
+def _query_timer(method: str):
+    return timed(registry.histogram('repository_seconds', 'Time spent in repository methods',
+                                    repository='audit', method=method))
+
+
+def partition_name(day: date) -> str:
+    return f'{PARTITION_PREFIX}{day:%Y%m%d}'
+
+
+class AuditRepository(ABC):
+    @abstractmethod
+    async def write(self, rows: list[tuple]):
+        """Stores rows with values in AUTH_EVENT_COLUMNS order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_partitions(self, first_day: date, days: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def drop_partitions_before(self, day: date) -> list[str]:
+        raise NotImplementedError
+
+
+class SqlaAuditRepository(AuditRepository):
+    # only one replica at a time creates or drops partitions, the others skip the run
+    _try_lock = text("SELECT pg_try_advisory_xact_lock(hashtext('auth_events_partitions'))")
+    _partitions = text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = CAST(:parent AS regclass)
+    """)
+
+    def __init__(self, engine: AsyncEngine, use_copy: bool | None = None):
+        self.__engine = engine
+        # COPY is only reachable through the asyncpg connection, other drivers get a multi-row INSERT
+        self.__use_copy = engine.dialect.driver == 'asyncpg' if use_copy is None else use_copy
+
+    @_query_timer('write')
+    async def write(self, rows: list[tuple]):
+        async with self.__engine.connect() as connection:
+            if self.__use_copy:
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    auth_events.name, records=rows, columns=AUTH_EVENT_COLUMNS)
+            else:
+                await connection.execute(insert(auth_events), [dict(zip(AUTH_EVENT_COLUMNS, row)) for row in rows])
+                await connection.commit()
+
+    async def create_partitions(self, first_day: date, days: int):
+        async with self.__engine.begin() as connection:
+            if not (await connection.execute(self._try_lock)).scalar():
+                return
+            for offset in range(days):
+                day = first_day + timedelta(days=offset)
+                await connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF {auth_events.name} "
+                    f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                ))
+
+    async def drop_partitions_before(self, day: date) -> list[str]:
+        dropped = []
+        async with self.__engine.begin() as connection:
+            if not (await connection.execute(self._try_lock)).scalar():
+                return dropped
+            await connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+            result = await connection.execute(self._partitions, {'parent': auth_events.name})
+            for name in result.scalars().all():
+                try:
+                    partition_day = datetime.strptime(name.removeprefix(PARTITION_PREFIX), '%Y%m%d').date()
+                except ValueError:
+                    continue
+                if partition_day < day:
+                    await connection.execute(text(f'DROP TABLE {name}'))
+                    dropped.append(name)
+        return dropped
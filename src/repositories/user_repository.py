@@ -1,12 +1,18 @@
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
+from src.core.metrics import registry, timed
 from src.models.user import User
 from abc import ABC, abstractmethod
 
 
+def _query_timer(method: str):
+    return timed(registry.histogram('repository_seconds', 'Time spent in repository methods',
+                                    repository='user', method=method))
+
+
 class UserRepository(ABC):
     @abstractmethod
     async def create(self, user):
@@ -33,6 +39,7 @@ class SqlaUserRepository(UserRepository):
     def __init__(self, session: AsyncSession):
         self.__session = session
 
+    @_query_timer('create')
     async def create(self, user: User) -> User:
         try:
             self.__session.add(user)
@@ -43,16 +50,19 @@ class SqlaUserRepository(UserRepository):
             await self.__session.rollback()
             raise
 
+    @_query_timer('get')
     async def get(self, user_id: UUID) -> User:
         stmt = select(User).where(User.id == user_id)
         result = await self.__session.execute(stmt)
         return result.unique().scalars().first()
 
+    @_query_timer('get_by_email')
     async def get_by_email(self, email: str) -> User:
-        stmt = select(User).where(User.email == email)
+        stmt = select(User).where(func.lower(User.email) == email.lower())
         result = await self.__session.execute(stmt)
         return result.unique().scalars().first()
 
+    @_query_timer('update')
     async def update(self, user_id: UUID, user: User) -> User:
         try:
             self.__session.add(user)
@@ -63,6 +73,7 @@ class SqlaUserRepository(UserRepository):
             await self.__session.rollback()
             raise
 
+    @_query_timer('delete')
     async def delete(self, user_id: UUID) -> User:
         stmt = delete(User).where(User.id == user_id).returning(User)
         try:
@@ -0,0 +1,30 @@
+from functools import cache
+from typing import Any
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+
+@cache
+def type_adapter(schema: Any) -> TypeAdapter:
+    """Validators and serializers are built once per schema and reused."""
+    return TypeAdapter(schema)
+
+
+def dump_json(schema: Any, value: Any) -> bytes:
+    return type_adapter(schema).dump_json(value)
+
+
+class ModelResponse(Response):
+    """Serializes pydantic models straight to JSON bytes.
+
+    Returning it from an endpoint skips FastAPI's response_model revalidation
+    and jsonable_encoder; anything other than a model is dumped with orjson.
+    """
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return dump_json(type(content), content)
+        return orjson.dumps(content)
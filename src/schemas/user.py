@@ -1,28 +1,27 @@
 from datetime import datetime
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, ConfigDict
 from pydantic import UUID4
 
 from src.models.user import AccountType
 
 
 class UserCreate(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     name: str
     email: EmailStr
     password: str
     account_type: AccountType
 
-    class Config:
-        from_attributes = True
-
 class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID4
     name: str
-    email: EmailStr
+    email: str  # validated on input already, EmailStr would re-run email_validator on every response
     account_type: AccountType
     created_at: datetime
     updated_at: datetime
     email_confirmed: bool
-
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    is_admin: bool = False
\ No newline at end of file
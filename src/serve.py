@@ -0,0 +1,189 @@
+"""Production entry point: python -m src.serve
+
+Runs uvicorn with one worker per available CPU (respecting cgroup quotas),
+uvloop and httptools when installed, and no file watching. The database
+connection budget is split between the workers.
+
+With several workers, metrics are summed over a directory all workers write to,
+and in-memory login throttling or email token stores are refused unless
+--allow-per-worker-state is given.
+"""
+import argparse
+import logging
+import math
+import os
+import shutil
+import tempfile
+from importlib.util import find_spec
+from pathlib import Path
+
+import uvicorn
+
+from src.core.config import get_settings, Settings
+from src.core.jwt_provider import JWTProvider
+from src.core.logging_config import configure_logging
+from src.core.security import calibrate, configured_params
+
+logger = logging.getLogger(__name__)
+
+
+def cpu_quota() -> float | None:
+    """CPUs granted by the cgroup CPU quota, None if unlimited."""
+    cgroup_v2 = Path('/sys/fs/cgroup/cpu.max')
+    cgroup_v1_quota = Path('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    cgroup_v1_period = Path('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    try:
+        if cgroup_v2.exists():
+            quota, period = cgroup_v2.read_text().split()
+            if quota == 'max':
+                return None
+            return int(quota) / int(period)
+        if cgroup_v1_quota.exists():
+            quota = int(cgroup_v1_quota.read_text())
+            if quota <= 0:
+                return None
+            return quota / int(cgroup_v1_period.read_text())
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def pool_sizing(budget: int, workers: int, pool_size: int, max_overflow: int, minimum: int = 1) -> tuple[int, int]:
+    """Splits a total connection budget between workers, keeping the pool/overflow ratio.
+
+    Every worker gets at least minimum connections; raises ValueError if the budget
+    doesn't cover that for all workers, since the total would exceed it otherwise.
+    """
+    per_worker = budget // workers
+    if per_worker < minimum:
+        raise ValueError(f'a budget of {budget} connections allows at most {budget // minimum} workers, '
+                         f'each needs {minimum}')
+    size = max(1, round(per_worker * pool_size / (pool_size + max_overflow)))
+    return size, max(0, per_worker - size)
+
+
+def connections_per_worker(settings: Settings) -> int:
+    """Connections a worker needs at least: one for requests and one for the audit writer if enabled.
+
+    A request holds at most one connection at a time: the database login throttle runs
+    before the request session is used, and email tokens are consumed through it.
+    """
+    return 1 + settings.AUDIT_ENABLED
+
+
+def share_state(parser: argparse.ArgumentParser, args: argparse.Namespace) -> Path | None:
+    """Configures the workers to share the state that is process-local by default.
+
+    Returns the metrics directory if it was created here and should be removed on exit.
+    """
+    settings = get_settings()
+    in_memory = [name for name, value in (('LOGIN_THROTTLE_BACKEND', settings.LOGIN_THROTTLE_BACKEND),
+                                          ('EMAIL_TOKEN_STORE', settings.EMAIL_TOKEN_STORE)) if value == 'memory']
+    if in_memory and not args.allow_per_worker_state:
+        # every worker would allow the configured attempts and accept each email token once
+        parser.error(f'{", ".join(in_memory)}=memory is per process, use the database with {args.workers} '
+                     f'workers or pass --allow-per-worker-state')
+
+    directory = settings.METRICS_MULTIPROCESS_DIR
+    if directory is not None:
+        directory.mkdir(parents=True, exist_ok=True)
+        # totals of a previous run must not be added to this one
+        for path in directory.glob('*.json'):
+            path.unlink(missing_ok=True)
+        return None
+    directory = Path(tempfile.mkdtemp(prefix='metrics-'))
+    os.environ['METRICS_MULTIPROCESS_DIR'] = str(directory)
+    return directory
+
+
+def calibrate_password_hashing(settings: Settings):
+    """Calibrates the password hash cost once for all workers.
+
+    Calibrating in each worker would run the workers' measurements concurrently on the
+    same CPUs and could give every worker a different cost.
+    """
+    scheme = settings.PASSWORD_HASH_SCHEME
+    params = calibrate(scheme, settings.PASSWORD_HASH_TARGET_MS / 1000, **configured_params(scheme))
+    logger.info(f'Calibrated {scheme} password hashing: {params}')
+    if scheme == 'argon2':
+        os.environ['PASSWORD_ARGON2_TIME_COST'] = str(params['time_cost'])
+    else:
+        os.environ['PASSWORD_BCRYPT_ROUNDS'] = str(params['rounds'])
+    os.environ['PASSWORD_HASH_CALIBRATE'] = 'false'
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='src.main:create_app', help='app factory')
+    parser.add_argument('--host', default=settings.WEB_HOST)
+    parser.add_argument('--port', type=int, default=settings.WEB_PORT)
+    parser.add_argument('--workers', type=int, default=settings.WEB_WORKERS)
+    parser.add_argument('--allow-per-worker-state', action='store_true',
+                        help='run several workers with in-memory login throttling or email token store')
+    args = parser.parse_args()
+
+    configure_logging(settings.LOG_LEVEL, settings.LOG_JSON, settings.LOG_QUEUE_SIZE, settings.LOG_SAMPLING)
+    budget = settings.DB_CONNECTION_BUDGET
+    minimum = connections_per_worker(settings)
+    if args.workers is None:
+        args.workers = available_cpus()
+        if budget and budget // minimum < args.workers:
+            # only the default is capped, an explicit worker count that doesn't fit is an error
+            args.workers = max(1, budget // minimum)
+            logger.warning(f'Capped workers to {args.workers} to stay within DB_CONNECTION_BUDGET={budget}')
+
+    # fail before spawning workers if the configuration or the keys are broken
+    JWTProvider.load_keys()
+
+    if settings.PASSWORD_HASH_CALIBRATE:
+        calibrate_password_hashing(settings)
+
+    metrics_dir = share_state(parser, args) if args.workers > 1 else None
+
+    if budget:
+        try:
+            pool_size, max_overflow = pool_sizing(budget, args.workers, settings.DB_POOL_SIZE,
+                                                  settings.DB_MAX_OVERFLOW, minimum)
+        except ValueError as e:
+            parser.error(f'DB_CONNECTION_BUDGET: {e}')
+        # workers are spawned processes and read their settings from the environment
+        os.environ['DB_POOL_SIZE'] = str(pool_size)
+        os.environ['DB_MAX_OVERFLOW'] = str(max_overflow)
+
+    loop = 'uvloop' if find_spec('uvloop') else 'auto'
+    http = 'httptools' if find_spec('httptools') else 'auto'
+    logger.info(f'Starting {args.workers} workers on {args.host}:{args.port} (loop={loop}, http={http})')
+    try:
+        uvicorn.run(
+            args.app,
+            factory=True,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            loop=loop,
+            http=http,
+            proxy_headers=True,
+            access_log=settings.ACCESS_LOG,
+            # uvicorn's loggers propagate to the queue handler configured by each worker
+            log_config=None,
+            timeout_graceful_shutdown=settings.SHUTDOWN_TIMEOUT,
+        )
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
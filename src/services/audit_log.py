@@ -0,0 +1,172 @@
+import asyncio
+import enum
+import logging
+import time
+from collections import deque
+from contextlib import suppress
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from src.core.metrics import registry
+from src.models.audit import auth_events
+from src.repositories.audit_repository import AuditRepository
+
+logger = logging.getLogger(__name__)
+
+flush_size = registry.histogram('audit_flush_size', 'Events written per audit flush',
+                                buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000))
+flush_lag = registry.histogram('audit_flush_lag_seconds', 'Age of the oldest event in an audit flush',
+                               buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+dropped_events = registry.counter('audit_events_dropped', 'Audit events dropped because the buffer was full')
+failed_flushes = registry.counter('audit_flush_failures', 'Audit flushes that failed and were retried')
+rejected_events = registry.counter('audit_events_rejected', 'Audit events discarded because the database refused them')
+
+# client supplied values are cut to the column sizes so they can't make a batch fail
+_EMAIL_LENGTH = auth_events.c.email.type.length
+_CLIENT_IP_LENGTH = auth_events.c.client_ip.type.length
+_DETAIL_LENGTH = auth_events.c.detail.type.length
+
+
+def _truncate(value: str | None, length: int) -> str | None:
+    return value[:length] if value is not None else None
+
+
+class AuditEvent(enum.Enum):
+    LOGIN = 'login'
+    REFRESH = 'refresh'
+    PASSWORD_RESET = 'password_reset'
+    EMAIL_CONFIRMATION = 'email_confirmation'
+
+
+class AuditLog:
+    """Buffers authentication events in memory and writes them in batches from a background task.
+
+    record() never waits for the database: when the buffer is full, new events are dropped
+    and counted. A batch is written as soon as batch_size events are buffered, or after
+    flush_interval seconds otherwise. A failed batch is retried; after max_attempts it is
+    written row by row and the rows the database still refuses are logged and discarded.
+    """
+
+    def __init__(self,
+                 repository: AuditRepository,
+                 batch_size: int = 500,
+                 flush_interval: float = 1.0,
+                 max_buffer: int = 50_000,
+                 retention_days: int = 90,
+                 partitions_ahead: int = 7,
+                 maintenance_interval: float = 3600,
+                 max_attempts: int = 3):
+        self._repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.retention_days = retention_days
+        self.partitions_ahead = partitions_ahead
+        self.maintenance_interval = maintenance_interval
+        self.max_attempts = max_attempts
+        self._buffer: deque[tuple] = deque()
+        # a batch that failed to write, retried before anything else in the buffer
+        self._retry: list[tuple] = []
+        self._attempts = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._next_maintenance = 0.0
+        registry.gauge('audit_buffer_size', 'Audit events waiting to be written', lambda: len(self._buffer))
+
+    def record(self,
+               event: AuditEvent,
+               success: bool,
+               user_id: UUID | None = None,
+               email: str | None = None,
+               client_ip: str | None = None,
+               detail: str | None = None):
+        buffer = self._buffer
+        if len(buffer) >= self.max_buffer:
+            dropped_events.inc()
+            return
+        buffer.append((datetime.utcnow(), event.value, success, user_id, _truncate(email, _EMAIL_LENGTH),
+                       _truncate(client_ip, _CLIENT_IP_LENGTH), _truncate(detail, _DETAIL_LENGTH)))
+        if len(buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Writes everything buffered so far. Returns False if a batch failed and is kept for a retry."""
+        buffer = self._buffer
+        while self._retry or buffer:
+            batch = self._retry or [buffer.popleft() for _ in range(min(self.batch_size, len(buffer)))]
+            self._retry = []
+            try:
+                await self._repository.write(batch)
+            except Exception:
+                failed_flushes.inc()
+                self._attempts += 1
+                logger.warning('Failed to write audit events', exc_info=True,
+                               extra={'events': len(batch), 'attempt': self._attempts})
+                if self._attempts < self.max_attempts:
+                    self._retry = batch
+                    return False
+                await self._write_rows(batch)
+            else:
+                flush_size.observe(len(batch))
+                flush_lag.observe((datetime.utcnow() - batch[0][0]).total_seconds())
+            self._attempts = 0
+        return True
+
+    async def _write_rows(self, batch: list[tuple]):
+        """Isolates the rows that keep a batch from being written; they are logged and discarded."""
+        written = 0
+        for row in batch:
+            try:
+                await self._repository.write([row])
+                written += 1
+            except Exception as e:
+                rejected_events.inc()
+                logger.error('Discarded audit event the database refused', extra={
+                    'event': row[1], 'occurred_at': row[0], 'error': type(e).__name__,
+                })
+        if written:
+            flush_size.observe(written)
+
+    async def maintain(self):
+        """Creates the upcoming daily partitions and drops the ones past retention."""
+        today = datetime.utcnow().date()
+        try:
+            await self._repository.create_partitions(today, self.partitions_ahead + 1)
+            dropped = await self._repository.drop_partitions_before(today - timedelta(days=self.retention_days))
+        except Exception:
+            logger.warning('Audit partition maintenance failed', exc_info=True)
+            # retry soon, partitions are created days in advance so there is slack
+            self._next_maintenance = time.monotonic() + 60
+            return
+        if dropped:
+            logger.info(f'Dropped audit partitions {", ".join(dropped)}')
+        self._next_maintenance = time.monotonic() + self.maintenance_interval
+
+    def start(self):
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        """Stops the writer after a last flush of the buffer."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._task, timeout)
+        self._task = None
+        unwritten = len(self._buffer) + len(self._retry)
+        if unwritten:
+            logger.warning(f'Audit log closed with {unwritten} events unwritten')
+
+    async def _run(self):
+        while not self._closing:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            if time.monotonic() >= self._next_maintenance:
+                await self.maintain()
+            if not await self.flush() and not self._closing:
+                # back off instead of retrying every time a full batch is recorded
+                await asyncio.sleep(self.flush_interval)
@@ -0,0 +1,46 @@
+import math
+
+from src.core.metrics import registry
+from src.core.rate_limit import RateLimiter
+from src.exceptions.throttle import TooManyAttempts
+
+
+class LoginThrottle:
+    def __init__(self,
+                 email_limiter: RateLimiter,
+                 ip_limiter: RateLimiter):
+        self._email_limiter = email_limiter
+        self._ip_limiter = ip_limiter
+        for name, limiter in (('email', email_limiter), ('ip', ip_limiter)):
+            self._register_metrics(name, limiter)
+
+    @staticmethod
+    def _register_metrics(name: str, limiter: RateLimiter):
+        registry.counter('login_throttle_allowed', 'Login attempts let through by the throttle',
+                         callback=lambda: limiter.allowed, limiter=name)
+        registry.counter('login_throttle_throttled', 'Login attempts rejected by the throttle',
+                         callback=lambda: limiter.throttled, limiter=name)
+        if 'keys' in limiter.stats():
+            registry.gauge('login_throttle_keys', 'Keys tracked by in-memory login limiters',
+                           lambda: limiter.stats()['keys'], limiter=name)
+            registry.counter('login_throttle_evicted', 'Keys evicted from in-memory login limiters',
+                             callback=lambda: limiter.stats()['evicted'], limiter=name)
+
+    async def check(self, email: str, client_ip: str | None):
+        if client_ip:
+            retry_after = await self._ip_limiter.hit(client_ip)
+            if retry_after:
+                raise TooManyAttempts('Too many login attempts from this address', math.ceil(retry_after))
+        retry_after = await self._email_limiter.hit(email.strip().lower())
+        if retry_after:
+            raise TooManyAttempts('Too many login attempts for this account', math.ceil(retry_after))
+
+    async def prune(self):
+        await self._email_limiter.prune()
+        await self._ip_limiter.prune()
+
+    def stats(self) -> dict:
+        return {
+            'email': self._email_limiter.stats(),
+            'ip': self._ip_limiter.stats(),
+        }
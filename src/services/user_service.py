@@ -1,12 +1,17 @@
+import asyncio
+import logging
 from uuid import UUID
 
 from jose import JWTError
 from pydantic import EmailStr
 
-from src.core.config import settings, email_settings
+from src.core.config import get_settings, get_email_settings
+from src.core.email_token import get_email_token_provider, TokenPurpose, ConsumedTokenStore
 from src.core.exceptions import InvalidTokenException
 from src.core.jwt_provider import JWTProvider
-from src.core.security import verify_password, hash_password
+from src.core.metrics import registry, timed
+from src.core.security import verify_and_update_password, hash_password, dummy_verify
+from src.exceptions.base import CloudsellIDException
 from src.exceptions.token import InvalidToken
 from src.exceptions.user import (UserNotFound,
                                  AuthenticationException,
@@ -16,47 +21,68 @@ from src.models.user import User
 from src.repositories.user_repository import UserRepository
 from src.schemas.token import FullToken, Token
 from src.schemas.user import UserCreate, UserOut
+from src.services.audit_log import AuditLog, AuditEvent
 from src.services.email_service import EmailService
 
+logger = logging.getLogger(__name__)
+
+
+def _service_timer(method: str):
+    return timed(registry.histogram('service_seconds', 'Time spent in service methods',
+                                    service='user', method=method))
+
 
 class UserService:
     def __init__(self,
                  repository: UserRepository,
-                 email_service: EmailService):
+                 email_service: EmailService,
+                 token_store: ConsumedTokenStore,
+                 audit_log: AuditLog | None = None):
         self.__repository = repository
         self.__email_service = email_service
+        self.__token_store = token_store
+        self.__audit_log = audit_log
+
+    def __audit(self, event: AuditEvent, error: Exception | None = None, **fields):
+        if self.__audit_log is not None:
+            self.__audit_log.record(event, error is None,
+                                    detail=type(error).__name__ if error else None, **fields)
 
+    @_service_timer('create')
     async def create(self, user: UserCreate) -> Token:
         existing_user = await self.__repository.get_by_email(user.email)
         if existing_user:
             raise UserAlreadyExists('User with such email already exists')
-        user_model = User(**user.dict())
-        hashed_password = hash_password(user_model.password)
+        user_model = User(**user.model_dump())
+        hashed_password = await asyncio.to_thread(hash_password, user_model.password)
         user_model.password = hashed_password
         inserted_user = await self.__repository.create(user_model)
         if not inserted_user:
             raise Exception('Failed to create user')
         token = self.__create_token(user_model.id, user_model.email, full_token=True)
         try:
-            user_out = UserOut.from_orm(inserted_user)
+            user_out = UserOut.model_validate(inserted_user)
             await self.send_confirmation_email(user_out)
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.warning('Failed to send confirmation email', exc_info=True, extra={'user_id': str(inserted_user.id)})
         finally:
             return token
 
+    @_service_timer('get')
     async def get(self, user_id: UUID | int) -> UserOut:
         user = await self.__repository.get(user_id)
         if not user:
             raise UserNotFound(f'No user with such id: {user_id}')
-        return UserOut.from_orm(user)
+        return UserOut.model_validate(user)
 
+    @_service_timer('delete')
     async def delete(self, user_id: UUID | int) -> UserOut:
         result = await self.__repository.delete(user_id)
         if not result:
             raise UserNotFound(f'No user with such id: {user_id}')
-        return UserOut.from_orm(result)
+        return UserOut.model_validate(result)
 
+    @_service_timer('verify_credentials')
     async def verify_credentials(self, token: str) -> UserOut:
         try:
             payload = self.__get_token_payload(token)
@@ -64,7 +90,7 @@ class UserService:
             user = await self.__repository.get(user_id)
             if not user:
                 raise UserNotFound(f'No user with such id: {user_id}')
-            return UserOut.from_orm(user)
+            return UserOut.model_validate(user)
         except InvalidToken as e:
             raise AuthorizationException(str(e))
 
@@ -90,43 +116,70 @@ class UserService:
         except JWTError as e:
             raise AuthenticationException('Failed to create token')
 
+    @_service_timer('authorize_user')
     async def authorize_user(self, email: str, password: str) -> UserOut:
         user = await self.__repository.get_by_email(email)
         if not user:
+            # spend the same time as a real verification so unknown emails can't be told apart
+            await asyncio.to_thread(dummy_verify)
             raise UserNotFound(f'No user with such email: {email}')
-        if not verify_password(password, user.password):
+        valid, new_hash = await asyncio.to_thread(verify_and_update_password, password, user.password)
+        if not valid:
             raise AuthenticationException('Incorrect password')
-        return UserOut.from_orm(user)
+        if new_hash:
+            user.password = new_hash
+            user = await self.__repository.update(user.id, user)
+        return UserOut.model_validate(user)
 
-    async def authenticate_user(self, email: str, password: str) -> Token:
-        user = await self.authorize_user(email, password)
+    @_service_timer('authenticate_user')
+    async def authenticate_user(self, email: str, password: str, client_ip: str | None = None) -> Token:
+        try:
+            user = await self.authorize_user(email, password)
+        except CloudsellIDException as e:
+            self.__audit(AuditEvent.LOGIN, e, email=email, client_ip=client_ip)
+            raise
+        self.__audit(AuditEvent.LOGIN, user_id=user.id, email=email, client_ip=client_ip)
         return self.__create_token(user.id, email, full_token=True)
 
+    @_service_timer('refresh_token')
     async def refresh_token(self, token: str) -> Token:
-        user = await self.verify_credentials(token)
+        try:
+            user = await self.verify_credentials(token)
+        except CloudsellIDException as e:
+            self.__audit(AuditEvent.REFRESH, e)
+            raise
+        self.__audit(AuditEvent.REFRESH, user_id=user.id)
         new_access_token = self.__create_token(user.id, user.email)
         return new_access_token
 
+    @_service_timer('reset_password')
     async def reset_password(self, password: str, token: str) -> UserOut:
+        email_tokens = get_email_token_provider()
         try:
-            payload = self.__get_token_payload(token)
-            if not payload.get('confirmation'):
-                raise AuthenticationException('Incorrect token')
-            user_db = await self.__repository.get_by_email(payload.get('email'))
+            user_id = email_tokens.decode(token, TokenPurpose.RESET_PASSWORD)
+            user_db = await self.__repository.get(user_id)
             if not user_db:
-                raise UserNotFound(f'No user with such email: {payload.get("email")}')
-            hashed_password = hash_password(password)
+                raise UserNotFound(f'No user with such id: {user_id}')
+            hashed_password = await asyncio.to_thread(hash_password, password)
+            # committed together with the update, so a failed update doesn't burn the link
+            await email_tokens.consume(token, TokenPurpose.RESET_PASSWORD, self.__token_store)
             user_db.password = hashed_password
             result = await self.__repository.update(user_db.id, user_db)
-            return UserOut.from_orm(result)
         except (InvalidTokenException, InvalidToken) as e:
+            self.__audit(AuditEvent.PASSWORD_RESET, e)
             raise AuthenticationException(str(e))
+        except CloudsellIDException as e:
+            self.__audit(AuditEvent.PASSWORD_RESET, e)
+            raise
+        self.__audit(AuditEvent.PASSWORD_RESET, user_id=result.id, email=result.email)
+        return UserOut.model_validate(result)
 
+    @_service_timer('send_confirmation_email')
     async def send_confirmation_email(self,
                                       user: UserOut):
         if user.email_confirmed:
             raise AlreadyConfirmed('This email already confirmed')
-        token = self.__generate_confirmation_token(user)
+        token = self.__generate_email_token(user.id, TokenPurpose.CONFIRM_EMAIL)
         data = {
             'user_id': user.id,
             'email': user.email,
@@ -136,14 +189,14 @@ class UserService:
                 'name': user.name,
             }
         }
-        result = await self.__email_service.send_email(email_settings.CONFIRMATION_EMAIL_TEMPLATE, data)
+        result = await self.__email_service.send_email(get_email_settings().CONFIRMATION_EMAIL_TEMPLATE, data)
 
+    @_service_timer('send_password_reset_email')
     async def send_password_reset_email(self, email: str):
         user = await self.__repository.get_by_email(email)
         if not user:
             raise UserNotFound(f'No user with such email: {email}')
-        user_out = UserOut.from_orm(user)
-        token = self.__generate_confirmation_token(user_out)
+        token = self.__generate_email_token(user.id, TokenPurpose.RESET_PASSWORD)
         data = {
             'user_id': user.id,
             'email': user.email,
@@ -153,33 +206,30 @@ class UserService:
                 'token': token,
             }
         }
-        result = await self.__email_service.send_email(email_settings.RESET_PASSWORD_EMAIL_TEMPLATE, data)
+        result = await self.__email_service.send_email(get_email_settings().RESET_PASSWORD_EMAIL_TEMPLATE, data)
 
-    def __generate_confirmation_token(self, user: UserOut) -> str:
-        try:
-            payload = {
-                'sub': str(user.id),
-                'email': user.email,
-                'confirmation': True,
-            }
-            token = JWTProvider.encode_refresh_token(payload, expires_delta=settings.CONFIRMATION_TOKEN_LIFETIME)
-            return token
-        except JWTError:
-            raise AuthorizationException('Failed to create token')
+    def __generate_email_token(self, user_id: UUID, purpose: int) -> str:
+        lifetime = get_settings().CONFIRMATION_TOKEN_LIFETIME * 24 * 60 * 60
+        return get_email_token_provider().encode(user_id, purpose, expires_delta=lifetime)
 
+    @_service_timer('confirm_email')
     async def confirm_email(self, token: str) -> UserOut:
+        email_tokens = get_email_token_provider()
         try:
-            payload = self.__get_token_payload(token)
-            if not payload.get('confirmation'):
-                raise AuthorizationException('No confirmation token')
-            user_id = payload.get('sub')
+            user_id = email_tokens.decode(token, TokenPurpose.CONFIRM_EMAIL)
             user = await self.__repository.get(user_id)
             if not user:
                 raise UserNotFound(f'No user with such id: {user_id}')
-        except InvalidToken as e:
+            await email_tokens.consume(token, TokenPurpose.CONFIRM_EMAIL, self.__token_store)
+        except (InvalidTokenException, InvalidToken) as e:
+            self.__audit(AuditEvent.EMAIL_CONFIRMATION, e)
             raise AuthorizationException(str(e))
+        except UserNotFound as e:
+            self.__audit(AuditEvent.EMAIL_CONFIRMATION, e)
+            raise
         user.email_confirmed = True
         result = await self.__repository.update(user.id, user)
         if not result:
             raise UserNotFound(f'No user with such id: {user.id}')
-        return UserOut.from_orm(result)
+        self.__audit(AuditEvent.EMAIL_CONFIRMATION, user_id=result.id, email=result.email)
+        return UserOut.model_validate(result)